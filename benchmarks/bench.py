@@ -0,0 +1,258 @@
+"""Transfer benchmarks: run perform_file_operation headless on synthetic trees and record the results as JSON.
+
+    python benchmarks/bench.py                          # all scenarios, 3 runs each
+    python benchmarks/bench.py --scenarios tiny mixed --scale 0.1 --repeat 5
+    python benchmarks/bench.py --set verify=true --set copy_backend='"buffered"'
+    python benchmarks/bench.py --compare benchmarks/results/<old commit>.json
+
+Every run happens in a fresh interpreter so peak RSS belongs to that run alone,
+with a fresh log database and an empty destination. Source trees are generated
+once per scenario/scale/seed in the work folder and reused, so they are usually
+in the page cache; the numbers measure the application, not a cold disk.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks.trees import SCENARIOS, ensure_tree
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss():
+    """Peak resident set size in bytes of this process or its largest worker process, or None if unknown"""
+    if resource is not None:
+        peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KB
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    return None
+
+
+def run_child(spec):
+    """Run one transfer in this process and return its measurements (called in a fresh interpreter)"""
+    from file_scheduler_persistent import FileSchedulerApp
+
+    workdir = spec['workdir']
+    destination = os.path.join(workdir, f"dest-{spec['scenario']}")
+    db_path = os.path.join(workdir, f"bench-{spec['scenario']}.db")
+    shutil.rmtree(destination, ignore_errors=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    config = {
+        'source_path': spec['source'],
+        'destination_path': destination,
+        'operation_type': "copy",
+        'use_date_folders': False,
+        'workers': spec['workers'],
+    }
+    config.update(spec['settings'])
+    config_path = os.path.join(workdir, f"bench-{spec['scenario']}.json")
+    with open(config_path, 'w') as f:
+        json.dump(config, f)
+
+    app = FileSchedulerApp(root=None, config_file=config_path, db_path=db_path)
+    if spec.get('latency'):
+        from benchmarks.latency import simulate_latency
+        os.makedirs(destination, exist_ok=True)
+        simulate_latency(destination, spec['latency'] / 1000)
+    rss_before = peak_rss()
+    started = time.perf_counter()
+    success = app.perform_file_operation()
+    seconds = time.perf_counter() - started
+    app.db.close()
+
+    with sqlite3.connect(db_path) as conn:
+        run_id, files, size = conn.execute(
+            "SELECT run_id, (SELECT COUNT(*) FROM file_transfers WHERE outcome = 'transferred'), bytes_transferred "
+            "FROM transfer_runs").fetchone()
+        phases = dict(conn.execute("SELECT phase, seconds FROM run_phases WHERE run_id = ?", (run_id,)).fetchall())
+    db_bytes = sum(os.path.getsize(db_path + suffix) for suffix in ("", "-wal") if os.path.exists(db_path + suffix))
+    shutil.rmtree(destination, ignore_errors=True)
+
+    return {
+        'success': success,
+        'seconds': seconds,
+        'files': files,
+        'bytes': size or 0,
+        'files_per_sec': files / seconds if seconds else 0.0,
+        'mb_per_sec': (size or 0) / seconds / (1024 * 1024) if seconds else 0.0,
+        'peak_rss_bytes': peak_rss(),
+        'startup_rss_bytes': rss_before,
+        'db_seconds': phases.get('db', 0.0),
+        'db_share': phases.get('db', 0.0) / seconds if seconds else 0.0,
+        'db_bytes': db_bytes,
+        'phases': phases,
+    }
+
+
+def run_scenario(scenario, args, settings):
+    """Run a scenario args.repeat times, each in its own interpreter; returns the summary and the raw runs"""
+    source, files, size = ensure_tree(args.workdir, scenario, args.scale, args.seed)
+    runs = []
+    for attempt in range(args.repeat):
+        spec = {'scenario': scenario, 'source': source, 'workdir': args.workdir, 'workers': args.workers,
+                'settings': settings, 'latency': getattr(args, 'latency', 0)}
+        result_path = os.path.join(args.workdir, f"result-{scenario}.json")
+        command = [sys.executable, os.path.abspath(__file__), '--child', json.dumps(spec), '--result', result_path]
+        output = None if args.verbose else subprocess.DEVNULL
+        subprocess.run(command, check=True, stdout=output, cwd=REPO_DIR)
+        with open(result_path) as f:
+            run = json.load(f)
+        if not run['success']:
+            raise RuntimeError(f"Benchmark run '{scenario}' failed; rerun with --verbose for details")
+        runs.append(run)
+        print(f"  {scenario} run {attempt + 1}/{args.repeat}: {run['seconds']:.2f}s, "
+              f"{run['files_per_sec']:.0f} files/s, {run['mb_per_sec']:.1f} MB/s")
+
+    median = lambda key: statistics.median(run[key] for run in runs)
+    rss = [run['peak_rss_bytes'] for run in runs if run['peak_rss_bytes'] is not None]
+    return {
+        'description': SCENARIOS[scenario][0],
+        'files': files,
+        'bytes': size,
+        'seconds': median('seconds'),
+        'files_per_sec': median('files_per_sec'),
+        'mb_per_sec': median('mb_per_sec'),
+        'peak_rss_bytes': max(rss) if rss else None,
+        'db_seconds': median('db_seconds'),
+        'db_share': median('db_share'),
+        'db_bytes': median('db_bytes'),
+        'runs': runs,
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(baseline, current):
+    """Print the change in throughput per scenario against an earlier results file"""
+    print(f"\nCompared with {baseline['commit']} ({baseline['timestamp']}):")
+    for scenario, result in current['results'].items():
+        old = baseline['results'].get(scenario)
+        if old is None:
+            print(f"  {scenario}: not in baseline")
+            continue
+        changes = []
+        for key, label in (('files_per_sec', "files/s"), ('mb_per_sec', "MB/s"), ('peak_rss_bytes', "peak RSS"),
+                           ('db_seconds', "db time")):
+            if old.get(key) and result.get(key) is not None:
+                changes.append(f"{label} {(result[key] - old[key]) / old[key] * 100:+.1f}%")
+        print(f"  {scenario}: " + ", ".join(changes))
+
+
+def parse_setting(text):
+    """key=value config override; the value is parsed as JSON when possible, e.g. verify=true"""
+    key, _, value = text.partition('=')
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transfer benchmarks on synthetic trees')
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS),
+                        help='Scenarios to run (default: all)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply file counts (or huge file sizes) by this')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per scenario; the median is reported')
+    parser.add_argument('--workers', type=int, default=4, help='Parallel transfers')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the generated trees')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE', type=parse_setting,
+                        help='Config override for every run, e.g. --set verify=true')
+    parser.add_argument('--latency', type=float, default=0, help='Simulated milliseconds per destination call')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'mftapp-bench'),
+                        help='Where source trees, destinations and databases are created')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', metavar='RESULTS', help='Earlier results file to compare against')
+    parser.add_argument('--verbose', action='store_true', help='Show the output of the transfers')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with open(args.result, 'w') as f:
+            json.dump(run_child(json.loads(args.child)), f)
+        return
+
+    os.makedirs(args.workdir, exist_ok=True)
+    settings = dict(args.set)
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'scale': args.scale,
+        'repeat': args.repeat,
+        'workers': args.workers,
+        'seed': args.seed,
+        'latency_ms': args.latency,
+        'settings': settings,
+        'results': {},
+    }
+
+    for scenario in args.scenarios:
+        print(f"{scenario}: {SCENARIOS[scenario][0]}")
+        report['results'][scenario] = run_scenario(scenario, args, settings)
+
+    print(f"\n{'scenario':<8} {'files':>8} {'MB':>9} {'seconds':>8} {'files/s':>9} {'MB/s':>8} {'peak RSS MB':>12} {'db %':>6}")
+    for scenario, result in report['results'].items():
+        rss = f"{result['peak_rss_bytes'] / (1024 * 1024):.0f}" if result['peak_rss_bytes'] else "n/a"
+        print(f"{scenario:<8} {result['files']:>8} {result['bytes'] / (1024 * 1024):>9.1f} {result['seconds']:>8.2f} "
+              f"{result['files_per_sec']:>9.0f} {result['mb_per_sec']:>8.1f} {rss:>12} {result['db_share'] * 100:>6.1f}")
+
+    output = args.output or os.path.join(REPO_DIR, 'benchmarks', 'results', f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Latency benchmark: the thread and asyncio engines against a simulated high-latency destination.
+
+    python benchmarks/latency.py                        # 20 ms per destination call
+    python benchmarks/latency.py --latency 5 --scenario tiny --scale 0.05
+
+Every metadata call on the destination (mkdir, open, utime, chmod, rename)
+sleeps for --latency milliseconds first, like a round-trip to a remote share.
+Sleeping releases the GIL just as waiting on the network does, so the engines
+see the same concurrency they would against a real share.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench import REPO_DIR, run_scenario, git_commit
+from benchmarks.trees import SCENARIOS
+
+# Destination calls that cost a round-trip on a network share
+_REMOTE_CALLS = ("mkdir", "open", "utime", "chmod", "replace", "rename")
+
+# engine settings compared by default: a small and a large thread pool, and the asyncio engine
+DEFAULT_CONFIGURATIONS = [
+    ("threads x4", {'engine': "threads"}, 4),
+    ("threads x64", {'engine': "threads"}, 64),
+    ("asyncio 256/16", {'engine': "asyncio", 'async_in_flight': 256, 'async_io_threads': 16}, 4),
+    ("asyncio 256/64", {'engine': "asyncio", 'async_in_flight': 256, 'async_io_threads': 64}, 4),
+]
+
+
+def simulate_latency(root, seconds):
+    """Make every os call on a path below root wait `seconds` first (for this process only)"""
+    root = os.path.abspath(root)
+
+    def delayed(func):
+        def call(path, *args, **kwargs):
+            if isinstance(path, str) and os.path.abspath(path).startswith(root):
+                time.sleep(seconds)
+            return func(path, *args, **kwargs)
+        return call
+
+    for name in _REMOTE_CALLS:
+        setattr(os, name, delayed(getattr(os, name)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Thread vs asyncio engine on a simulated high-latency destination')
+    parser.add_argument('--latency', type=float, default=20.0, help='Milliseconds per destination call')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default="tiny", help='Source tree to copy')
+    parser.add_argument('--scale', type=float, default=0.05, help='Scale of the source tree')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per configuration; the median is reported')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the generated tree')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'mftapp-bench'),
+                        help='Where source trees, destinations and databases are created')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<commit>-latency.json)')
+    parser.add_argument('--verbose', action='store_true', help='Show the output of the transfers')
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    commit = git_commit()
+    report = {'commit': commit, 'timestamp': datetime.now().isoformat(timespec='seconds'), 'latency_ms': args.latency,
+              'scenario': args.scenario, 'scale': args.scale, 'results': {}}
+
+    for name, settings, workers in DEFAULT_CONFIGURATIONS:
+        print(name)
+        run_args = argparse.Namespace(workdir=args.workdir, scale=args.scale, seed=args.seed, repeat=args.repeat,
+                                      workers=workers, verbose=args.verbose, latency=args.latency)
+        result = run_scenario(args.scenario, run_args, settings)
+        result.pop('runs')
+        report['results'][name] = result
+
+    print(f"\n{'engine':<16} {'files/s':>8} {'MB/s':>8} {'seconds':>8} {'peak RSS MB':>12}")
+    for name, result in report['results'].items():
+        rss = f"{result['peak_rss_bytes'] / (1024 * 1024):.0f}" if result['peak_rss_bytes'] else "n/a"
+        print(f"{name:<16} {result['files_per_sec']:>8.0f} {result['mb_per_sec']:>8.2f} {result['seconds']:>8.2f} {rss:>12}")
+
+    output = args.output or os.path.join(REPO_DIR, 'benchmarks', 'results', f"{commit}-latency.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
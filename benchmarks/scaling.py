@@ -0,0 +1,86 @@
+"""Engine scaling benchmark: the same CPU-heavy run (verify + gzip by default) with 1..N workers per engine.
+
+    python benchmarks/scaling.py                        # 1, 2, 4, ... up to the CPU count
+    python benchmarks/scaling.py --workers 1 2 4 8 --scenario mixed --scale 0.5
+
+Shows how far each engine scales with cores, as the speedup over one worker. The
+results only mean something on a machine with at least as many cores as workers;
+no multi-core results have been recorded for the process engine yet. Record them
+with --output benchmarks/results/scaling.json, the one results file kept in git.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench import REPO_DIR, run_scenario, git_commit, parse_setting
+from benchmarks.trees import SCENARIOS
+
+CPU_HEAVY_SETTINGS = {'verify': True, 'verify_algorithm': "sha256", 'compression': "gzip"}
+
+
+def default_worker_counts():
+    counts, count = [], 1
+    while count < (os.cpu_count() or 1):
+        counts.append(count)
+        count *= 2
+    return counts + [os.cpu_count() or 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scaling of the thread and process engines with worker count')
+    parser.add_argument('--workers', type=int, nargs='+', default=default_worker_counts(), help='Worker counts to try')
+    parser.add_argument('--engines', nargs='+', default=["threads", "processes"], help='Engines to compare')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default="mixed", help='Source tree to copy')
+    parser.add_argument('--scale', type=float, default=0.25, help='Scale of the source tree')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per point; the median is reported')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the generated tree')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE', type=parse_setting,
+                        help='Config override (default settings: verify with sha256 and gzip compression)')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'mftapp-bench'),
+                        help='Where source trees, destinations and databases are created')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<commit>-scaling.json)')
+    parser.add_argument('--verbose', action='store_true', help='Show the output of the transfers')
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if max(args.workers) > cpus:
+        print(f"WARNING: only {cpus} CPU{'s' if cpus != 1 else ''} here; results above {cpus} workers do not show core scaling")
+    os.makedirs(args.workdir, exist_ok=True)
+    settings = dict(CPU_HEAVY_SETTINGS, **dict(args.set))
+    commit = git_commit()
+    report = {'commit': commit, 'timestamp': datetime.now().isoformat(timespec='seconds'), 'cpus': os.cpu_count(),
+              'scenario': args.scenario, 'scale': args.scale, 'settings': settings, 'results': {}}
+
+    for engine in args.engines:
+        points = report['results'][engine] = []
+        for workers in args.workers:
+            print(f"{engine}, {workers} workers")
+            run_args = argparse.Namespace(workdir=args.workdir, scale=args.scale, seed=args.seed, repeat=args.repeat,
+                                          workers=workers, verbose=args.verbose)
+            result = run_scenario(args.scenario, run_args, dict(settings, engine=engine))
+            result.pop('runs')
+            points.append(dict(result, workers=workers))
+
+    print(f"\n{'engine':<10} {'workers':>7} {'MB/s':>8} {'files/s':>8} {'speedup':>8} {'peak RSS MB':>12}")
+    for engine, points in report['results'].items():
+        base = points[0]['mb_per_sec'] or 1
+        for point in points:
+            point['speedup'] = point['mb_per_sec'] / base
+            rss = f"{point['peak_rss_bytes'] / (1024 * 1024):.0f}" if point['peak_rss_bytes'] else "n/a"
+            print(f"{engine:<10} {point['workers']:>7} {point['mb_per_sec']:>8.1f} {point['files_per_sec']:>8.0f} "
+                  f"{point['speedup']:>7.2f}x {rss:>12}")
+
+    output = args.output or os.path.join(REPO_DIR, 'benchmarks', 'results', f"{commit}-scaling.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
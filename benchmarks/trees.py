@@ -0,0 +1,82 @@
+import os
+import random
+
+# Files are cut from one block of seeded random bytes: identical on every machine
+# and incompressible, so later compression or dedup tricks cannot flatter a result
+BLOCK_SIZE = 1024 * 1024
+
+KB = 1024
+MB = 1024 * KB
+
+# name -> (description, settings); counts and sizes are multiplied by --scale
+SCENARIOS = {
+    'tiny': ("Many tiny files (1 KB) in a shallow tree",
+             {'files': 20000, 'min_size': 1 * KB, 'max_size': 1 * KB, 'depth': 2, 'fanout': 16}),
+    'mixed': ("Mixed sizes from 1 KB to 8 MB, log-uniform",
+              {'files': 2000, 'min_size': 1 * KB, 'max_size': 8 * MB, 'depth': 3, 'fanout': 8}),
+    'huge': ("A few huge files",
+             {'files': 4, 'min_size': 256 * MB, 'max_size': 256 * MB, 'depth': 0, 'fanout': 1}),
+    'deep': ("Small files in a 32-level deep tree",
+             {'files': 2000, 'min_size': 4 * KB, 'max_size': 4 * KB, 'depth': 32, 'fanout': 2}),
+}
+
+
+def scaled(settings, scale):
+    """Scale a scenario: file counts for the many-file trees, file sizes for the huge one"""
+    settings = dict(settings)
+    if settings['files'] >= 100:
+        settings['files'] = max(1, int(settings['files'] * scale))
+    else:
+        settings['min_size'] = max(1, int(settings['min_size'] * scale))
+        settings['max_size'] = max(1, int(settings['max_size'] * scale))
+    return settings
+
+
+def generate(root, scenario, scale=1.0, seed=0):
+    """Create the synthetic tree for a scenario below root; returns (files, bytes).
+
+    The same scenario, scale and seed always produce the same paths, sizes and contents.
+    """
+    settings = scaled(SCENARIOS[scenario][1], scale)
+    rng = random.Random(f"{scenario}-{seed}")
+    block = rng.randbytes(BLOCK_SIZE)
+    total = 0
+
+    for index in range(settings['files']):
+        # Spread files over the tree by taking base-fanout digits of the index as folder names
+        parts, value = [], index
+        for level in range(settings['depth']):
+            parts.append(f"d{level}_{value % settings['fanout']}")
+            value //= settings['fanout']
+        directory = os.path.join(root, *parts)
+        os.makedirs(directory, exist_ok=True)
+
+        if settings['min_size'] == settings['max_size']:
+            size = settings['min_size']
+        else:
+            size = int(2 ** rng.uniform(settings['min_size'].bit_length() - 1, settings['max_size'].bit_length() - 1))
+        offset = rng.randrange(BLOCK_SIZE)
+        with open(os.path.join(directory, f"file{index:06d}.bin"), 'wb') as f:
+            remaining = size
+            while remaining:
+                piece = block[offset:offset + remaining] or block[:remaining]
+                f.write(piece)
+                remaining -= len(piece)
+                offset = 0
+        total += size
+
+    return settings['files'], total
+
+
+def ensure_tree(workdir, scenario, scale=1.0, seed=0):
+    """Generate the tree once and reuse it on later runs; returns (path, files, bytes)"""
+    root = os.path.join(workdir, f"{scenario}-x{scale:g}-seed{seed}")
+    marker = os.path.join(workdir, f"{scenario}-x{scale:g}-seed{seed}.done")
+    if os.path.exists(marker):
+        with open(marker) as f:
+            files, total = (int(value) for value in f.read().split())
+        return root, files, total
+    files, total = generate(root, scenario, scale, seed)
+    with open(marker, 'w') as f:
+        f.write(f"{files} {total}")
+    return root, files, total
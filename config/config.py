@@ -10,7 +10,9 @@ except ImportError:
     
 def save_config(self):
         """Save configuration to file"""
-        config = {
+        # Start from the loaded config so settings without a widget (e.g. workers) are kept
+        config = dict(getattr(self, 'config', {}))
+        config.update({
             'network_path': self.network_path.get(),
             'network_user': self.network_user.get(),
             'network_pass': self.network_pass.get(),
@@ -31,7 +33,7 @@ def save_config(self):
             'recipient_email': self.recipient_email.get() if self.gui_mode else self.config.get('recipient_email', ''),
             'use_tls': self.use_tls.get() if self.gui_mode else self.config.get('use_tls', True),
             'task_name': self.task_name.get() if self.gui_mode else self.config.get('task_name', 'FileScheduler_Task')
-        }
+        })
         
         
         try:
@@ -57,6 +59,7 @@ def load_config(self):
         config_path = os.path.join(self.script_dir, self.config_file)
         with open(config_path, 'r') as f:
             config = json.load(f)
+        self.config = config
         
         if self.gui_mode:
             # Load network share configuration
@@ -111,13 +114,17 @@ def load_config_dict(self):
 
 def on_closing(self):
     """Handle application closing"""
-    if self.conn:
-        self.conn.close()
+    for notifier in self.notifiers.values():
+        notifier.close()  # Sends queued notifications and any pending digest first
+    if self.db:
+        self.db.close()  # Commits any queued log writes first
     
     if self.gui_mode:
         self.root.destroy()
 
 def map_network_drive(drive_letter, network_path, username, password):
+    if os.name != 'nt':
+        return True  # Drive letters and net use are Windows-only; elsewhere mount the share beforehand
 
     # Disconnect previous mappings
     subprocess.run(['net', 'use', f'{drive_letter}:', '/delete'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -134,4 +141,6 @@ def map_network_drive(drive_letter, network_path, username, password):
     return result.returncode == 0
 
 def unmap_network_drive(drive_letter):
+    if os.name != 'nt':
+        return
     subprocess.run(['net', 'use', f'{drive_letter}:', '/delete'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -0,0 +1,140 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+
+class Database:
+    """The application's only way into the log database.
+
+    Writes: write(func, *args) queues func(conn, *args) for the one writer
+    thread, which owns the only write connection. Jobs that are queued while
+    the writer is busy are committed together in a single transaction (group
+    commit), each inside its own savepoint so a failing job is rolled back
+    without taking the others with it. Because nothing else in the process
+    writes, concurrent runs and the GUI never compete for the write lock. The
+    write functions in this package therefore never commit themselves.
+
+    Reads: reader() returns a query-only connection belonging to the calling
+    thread, opened on first use, so no connection is ever shared between threads.
+    A thread should call close_reader() before it ends; connections of threads
+    that ended without doing so are closed the next time a reader is opened.
+    """
+
+    def __init__(self, db_path, max_group=500, busy_timeout=30.0):
+        self.db_path = db_path
+        self.max_group = max(1, int(max_group))
+        self.busy_timeout = busy_timeout
+        self.jobs = queue.Queue()
+        self.local = threading.local()
+        self.readers = {}  # thread -> its read connection
+        self.readers_lock = threading.Lock()
+        self.closed = False
+        self.writer = threading.Thread(target=self._write_loop, name="db-writer", daemon=True)
+        self.writer.start()
+
+    def write(self, func, *args):
+        """Queue func(conn, *args) for the writer; returns a Future that resolves once it is committed"""
+        if self.closed:
+            raise RuntimeError("Database is closed")
+        future = Future()
+        self.jobs.put((func, args, future))
+        return future
+
+    def call(self, func, *args):
+        """Run func(conn, *args) on the writer and wait for it to be committed; returns its result"""
+        return self.write(func, *args).result()
+
+    def flush(self):
+        """Wait until every write queued so far is committed"""
+        self.call(lambda conn: None)
+
+    def reader(self):
+        """This thread's query-only connection"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # check_same_thread is off only so close() can close it; it is never used by another thread
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            self.local.conn = conn
+            with self.readers_lock:
+                for thread in [thread for thread in self.readers if not thread.is_alive()]:
+                    self.readers.pop(thread).close()
+                self.readers[threading.current_thread()] = conn
+        return conn
+
+    def close_reader(self):
+        """Close this thread's read connection, for a thread that is about to end"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            self.local.conn = None
+            with self.readers_lock:
+                # close() may have closed and dropped it already
+                if self.readers.get(threading.current_thread()) is conn:
+                    del self.readers[threading.current_thread()]
+            conn.close()
+
+    def close(self):
+        """Commit what is queued, stop the writer and close every connection"""
+        if self.closed:
+            return
+        self.closed = True
+        self.jobs.put(None)
+        self.writer.join()
+        with self.readers_lock:
+            for conn in self.readers.values():
+                conn.close()
+            self.readers.clear()
+
+    def _write_loop(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+        try:
+            stopping = False
+            while not stopping:
+                job = self.jobs.get()
+                if job is None:
+                    break
+                group = [job]
+                # Whatever queued up during the last commit goes into this one
+                while len(group) < self.max_group:
+                    try:
+                        job = self.jobs.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        stopping = True
+                        break
+                    group.append(job)
+                self._commit_group(conn, group)
+        finally:
+            conn.close()
+
+    def _commit_group(self, conn, group):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")  # Waits up to busy_timeout for a writer in another process
+            for func, args, future in group:
+                conn.execute("SAVEPOINT job")
+                try:
+                    result = func(conn, *args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    print(f"Database write failed ({getattr(func, '__name__', 'job')}): {e}")
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, result, None))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"Database commit failed, {len(group)} writes lost: {e}")
+            for func, args, future in group:
+                future.set_exception(e)
+            return
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
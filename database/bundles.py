@@ -0,0 +1,31 @@
+from datetime import datetime
+
+
+def save_bundle_index(conn, run_id, rows):
+    """Record where bundled files went; rows are (rel_path, bundle_path, member_offset, data_offset, size, mtime)"""
+    if not rows:
+        return
+    timestamp = datetime.now().isoformat()
+    conn.executemany("""
+        INSERT INTO bundle_index (run_id, rel_path, bundle_path, member_offset, data_offset, size, mtime, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(run_id, rel_path, bundle_path, member_offset, data_offset, size, mtime, timestamp)
+          for rel_path, bundle_path, member_offset, data_offset, size, mtime in rows])
+
+
+def find_bundled(conn, pattern, run_id=None):
+    """Bundled files whose relative path matches a GLOB pattern, newest first, as dicts"""
+    query = """
+        SELECT run_id, rel_path, bundle_path, member_offset, data_offset, size, mtime, timestamp
+        FROM bundle_index
+        WHERE rel_path GLOB ?
+    """
+    params = [pattern]
+    if run_id:
+        query += " AND run_id = ?"
+        params.append(run_id)
+    query += " ORDER BY id DESC"
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
@@ -0,0 +1,13 @@
+from datetime import datetime
+
+
+def save_checksums(conn, run_id, rows):
+    """Store verify-mode digests; rows are (rel_path, algorithm, source_digest, dest_digest, verified)"""
+    if not rows:
+        return
+    timestamp = datetime.now().isoformat()
+    conn.executemany("""
+        INSERT INTO file_checksums (run_id, rel_path, algorithm, source_digest, dest_digest, verified, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [(run_id, rel_path, algorithm, source_digest, dest_digest, int(verified), timestamp)
+          for rel_path, algorithm, source_digest, dest_digest, verified in rows])
@@ -1,44 +1,44 @@
 import sqlite3
 import os
+import threading
 from datetime import datetime, timedelta
 import tkinter as tk
 from tkinter import filedialog, messagebox
-
-def init_database(self):
-    """Initialize SQLite database for logging"""
-    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'file_scheduler_log.db')
-    self.conn = sqlite3.connect(db_path, timeout=30.0)
-    self.conn.execute("PRAGMA journal_mode=WAL")  # Enable WAL mode for better concurrency
-    cursor = self.conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS file_operations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT NOT NULL,
-            source_path TEXT NOT NULL,
-            destination_path TEXT NOT NULL,
-            final_destination TEXT NOT NULL,
-            operation_type TEXT NOT NULL,
-            status TEXT NOT NULL,
-            files_processed INTEGER,
-            error_message TEXT,
-            schedule_time TEXT,
-            date_folder TEXT,
-            execution_mode TEXT DEFAULT 'GUI'
-        )
-    """)
-    self.conn.commit()
-    print(f"Database initialized at: {db_path}")
+from database.access import Database
+from database.migrations import migrate
+from database.retention import delete_in_chunks
+from database.logs import log_filter_clause, latest_log_id, fetch_log_page, fetch_new_logs
+from database.export import export_records, available_export_formats
+
+def init_database(self, db_path=None):
+    """Initialize SQLite database for logging (by default file_scheduler_log.db next to this module)"""
+    db_path = db_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'file_scheduler_log.db')
+    self.db_path = db_path
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    try:
+        # Before WAL mode, which writes the first page: a new file can only switch auto_vacuum while it is empty
+        version = migrate(conn)  # Creates the tables, or upgrades a database from an older release
+        conn.execute("PRAGMA journal_mode=WAL")  # Enable WAL mode for better concurrency
+    finally:
+        conn.close()
+    # All later access goes through the writer thread and per-thread readers
+    self.db = Database(db_path)
+    print(f"Database initialized at: {db_path} (schema version {version})")
+
+
+def insert_log_entry(conn, row):
+    """Write one file_operations row (a tuple in the column order below)"""
+    conn.execute("""
+        INSERT INTO file_operations 
+        (timestamp, source_path, destination_path, final_destination, operation_type, status, 
+            files_processed, error_message, schedule_time, date_folder, execution_mode, run_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, row)
     
     
-def log_operation(self, status, message, files_processed, details, date_folder,execution_mode="GUI", conn=None):
+def log_operation(self, status, message, files_processed, details, date_folder,execution_mode="GUI", run_id=None):
+    """Queue a log entry for the writer thread; returns its Future (None if it could not be queued)"""
     try:
-        connection = conn if conn is not None else self.conn
-        if not connection:
-            self.init_database()
-            connection = self.conn
-
-        cursor = connection.cursor()
-
         # Get configuration values safely
         if self.gui_mode:
             source_path = self.source_path.get()
@@ -54,12 +54,7 @@ def log_operation(self, status, message, files_processed, details, date_folder,e
             final_dest = os.path.join(destination_path, date_folder) if date_folder else destination_path
 
         # Insert log record
-        cursor.execute("""
-            INSERT INTO file_operations 
-            (timestamp, source_path, destination_path, final_destination, operation_type, status, 
-                files_processed, error_message, schedule_time, date_folder, execution_mode)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        future = self.db.write(insert_log_entry, (
             datetime.now().isoformat(),
             source_path,
             destination_path,
@@ -70,114 +65,165 @@ def log_operation(self, status, message, files_processed, details, date_folder,e
             details,
             schedule_time,
             date_folder,
-            execution_mode
+            execution_mode,
+            run_id
         ))
-        connection.commit()
 
-        print(f"[{execution_mode}] Log entry created: {status} - {message}")
+        def logged(future):
+            # Runs on the writer thread once the entry is committed (or failed)
+            if future.exception() is not None:
+                print(f"[{execution_mode}] Failed to log operation: {str(future.exception())}")
+                return
+            print(f"[{execution_mode}] Log entry created: {status} - {message}")
 
-        # Update status bar if in GUI mode
-        if self.gui_mode:
-            self.status_var.set(f"{status}: {message}")
+            # Update status bar and refresh logs if in GUI mode
+            if self.gui_mode:
+                try:
+                    self.root.after(0, lambda: self.status_var.set(f"{status}: {message}"))
+                    self.root.after(0, lambda: refresh_logs(self))
+                except:
+                    pass
 
-        # Refresh logs if visible
-        if self.gui_mode:
-            try:
-                from .db import refresh_logs
-                self.root.after(0, lambda: refresh_logs(self))
-            except:
-                pass
+        future.add_done_callback(logged)
+        return future
 
     except Exception as e:
         print(f"[{execution_mode}] Failed to log operation: {str(e)}")
         # Don't raise the exception to avoid breaking the main operation
+        return None
 
 
+LOG_PAGE_SIZE = 200
 
 
-def refresh_logs(self):
-    """Refresh the logs tree view"""
-    if not self.gui_mode:
-        return
+def log_filters(self):
+    """The filters chosen above the logs view, as accepted by database.logs"""
+    return {
+        'status': "" if self.log_status_filter.get() == "All" else self.log_status_filter.get(),
+        'execution_mode': "" if self.log_mode_filter.get() == "All" else self.log_mode_filter.get(),
+        'date_from': self.log_date_from.get().strip(),
+        'date_to': self.log_date_to.get().strip(),
+    }
 
-    # Clear existing items
-    for item in self.logs_tree.get_children():
-        self.logs_tree.delete(item)
 
+def log_row_values(row):
+    """Treeview values for a row from database.logs (the id is not shown)"""
     try:
-        # Open a new local DB connection (in the main thread)
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT timestamp, operation_type, status, files_processed, date_folder, 
-                       execution_mode, source_path, final_destination
-                FROM file_operations
-                ORDER BY timestamp DESC
-                LIMIT 200
-            """)
-
-            for row in cursor.fetchall():
-                try:
-                    timestamp = datetime.fromisoformat(row[0]).strftime('%Y-%m-%d %H:%M:%S')
-                except:
-                    timestamp = row[0]
+        timestamp = datetime.fromisoformat(row[1]).strftime('%Y-%m-%d %H:%M:%S')
+    except:
+        timestamp = row[1]
+
+    date_folder = row[5] if row[5] else "None"
+    execution_mode = row[6] if row[6] else "GUI"
+    source = row[7][:20] + "..." if len(row[7]) > 20 else row[7]
+    final_dest = row[8][:20] + "..." if len(row[8]) > 20 else row[8]
+    return (timestamp, row[2].title() if row[2] else "Unknown", row[3],
+            row[4], date_folder, execution_mode, source, final_dest)
 
-                date_folder = row[4] if row[4] else "None"
-                execution_mode = row[5] if row[5] else "GUI"
-                source = row[6][:20] + "..." if len(row[6]) > 20 else row[6]
-                final_dest = row[7][:20] + "..." if len(row[7]) > 20 else row[7]
 
-                self.logs_tree.insert('', 'end', values=(
-                    timestamp, row[1].title() if row[1] else "Unknown", row[2],
-                    row[3], date_folder, execution_mode, source, final_dest
-                ))
+def reset_logs(self):
+    """Empty the logs view and load its first page again, e.g. after the filters changed"""
+    if not self.gui_mode:
+        return
+    try:
+        filters = log_filters(self)
+        log_filter_clause(filters)  # Reject a malformed date before clearing the view
+    except ValueError:
+        messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format")
+        return
+    self.logs_tree.delete(*self.logs_tree.get_children())
+    self.log_view = {'filters': filters, 'newest_id': None, 'oldest': None, 'complete': False}
+    refresh_logs(self)
+
 
+def refresh_logs(self):
+    """Add the log entries written since the last refresh to the top of the logs view.
+
+    Only rows with a higher id than any seen so far are read, so a refresh after
+    every log write costs the same however long the history is. Older entries
+    are loaded a page at a time as the view is scrolled down (load_older_logs).
+    """
+    if not self.gui_mode:
+        return
+    if getattr(self, 'log_view', None) is None:
+        reset_logs(self)
+        return
+
+    view = self.log_view
+    try:
+        conn = self.db.reader()
+        newest_id = latest_log_id(conn)
+        if view['newest_id'] is None:
+            view['newest_id'] = newest_id
+            load_older_logs(self)
+        elif newest_id > view['newest_id']:
+            # Oldest first, each at the top, so the newest ends up first
+            for row in reversed(fetch_new_logs(conn, view['newest_id'], newest_id, view['filters'])):
+                if not self.logs_tree.exists(row[0]):
+                    self.logs_tree.insert('', 0, iid=row[0], values=log_row_values(row))
+            view['newest_id'] = newest_id
     except Exception as e:
         print(f"Error refreshing logs: {str(e)}")
 
-    
+
+def load_older_logs(self):
+    """Append the next page of older log entries to the bottom of the logs view"""
+    view = getattr(self, 'log_view', None)
+    if view is None or view['complete']:
+        return
+    try:
+        rows = fetch_log_page(self.db.reader(), view['filters'], view['oldest'], LOG_PAGE_SIZE)
+    except Exception as e:
+        print(f"Error loading older logs: {str(e)}")
+        return
+    for row in rows:
+        if not self.logs_tree.exists(row[0]):
+            self.logs_tree.insert('', 'end', iid=row[0], values=log_row_values(row))
+    if rows:
+        view['oldest'] = (rows[-1][1], rows[-1][0])
+    view['complete'] = len(rows) < LOG_PAGE_SIZE
+
+
 def clear_old_logs(self):
     """Clear logs older than 30 days"""
     try:
         if messagebox.askyesno("Confirm", "Clear all logs older than 30 days?"):
-            cursor = self.conn.cursor()
             cutoff_date = (datetime.now() - timedelta(days=30)).isoformat()
-            cursor.execute("DELETE FROM file_operations WHERE timestamp < ?", (cutoff_date,))
-            deleted_count = cursor.rowcount
-            self.conn.commit()
+            # In chunks, so a batch run logging at the same time waits for one chunk, not the whole delete
+            deleted_count = delete_in_chunks(self.db, 'file_operations', "timestamp < ?", (cutoff_date,))
             
             messagebox.showinfo("Success", f"Deleted {deleted_count} old log entries.")
-            refresh_logs(self)
+            reset_logs(self)
     except Exception as e:
         messagebox.showerror("Error", f"Failed to clear old logs:\n{str(e)}")
 
 def export_logs(self):
-    """Export logs to CSV file"""
+    """Export the logs matching the current filters to CSV, gzip'd JSON lines or Parquet"""
     try:
+        filetypes = [("CSV files", "*.csv"), ("JSON lines, gzip'd", "*.jsonl.gz")]
+        if "parquet" in available_export_formats():
+            filetypes.append(("Parquet files", "*.parquet"))
         file_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+            filetypes=filetypes + [("All files", "*.*")]
         )
         
         if file_path:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT timestamp, source_path, destination_path, final_destination,
-                        operation_type, status, files_processed, error_message,
-                        schedule_time, date_folder, execution_mode
-                FROM file_operations
-                ORDER BY timestamp DESC
-            """)
-            
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                import csv
-                writer = csv.writer(csvfile)
-                writer.writerow(['Timestamp', 'Source Path', 'Destination Path', 'Final Destination',
-                                'Operation Type', 'Status', 'Files Processed', 'Error Message',
-                                'Schedule Time', 'Date Folder', 'Execution Mode'])
-                writer.writerows(cursor.fetchall())
-            
-            messagebox.showinfo("Success", f"Logs exported to:\n{file_path}")
+            filters = log_filters(self)
+
+            def export():
+                # On its own thread, with that thread's reader, so a long export does not freeze the window
+                try:
+                    count = export_records(self.db.reader(), file_path, "operations", filters)
+                    self.root.after(0, lambda: messagebox.showinfo("Success", f"{count} log entries exported to:\n{file_path}"))
+                except Exception as e:
+                    error = str(e)
+                    self.root.after(0, lambda: messagebox.showerror("Error", f"Failed to export logs:\n{error}"))
+                finally:
+                    self.db.close_reader()
+
+            threading.Thread(target=export, daemon=True).start()
+            self.status_var.set(f"Exporting logs to {file_path}...")
             
     except Exception as e:
-        messagebox.showerror("Error", f"Failed to export logs:\n{str(e)}")
\ No newline at end of file
+        messagebox.showerror("Error", f"Failed to export logs:\n{str(e)}")
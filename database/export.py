@@ -0,0 +1,131 @@
+import os
+import csv
+import gzip
+import json
+from database.logs import log_filter_clause
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None  # Optional: pip install pyarrow for Parquet exports
+
+# What can be exported: the query, its columns with their Parquet types, and how the
+# status and mode filters apply to it. Dates always filter on the row's timestamp.
+DATASETS = {
+    "operations": {
+        'query': """
+            SELECT timestamp, source_path, destination_path, final_destination, operation_type, status,
+                   files_processed, error_message, schedule_time, date_folder, execution_mode, run_id
+            FROM file_operations
+        """,
+        'columns': [("timestamp", "string"), ("source_path", "string"), ("destination_path", "string"),
+                    ("final_destination", "string"), ("operation_type", "string"), ("status", "string"),
+                    ("files_processed", "int64"), ("error_message", "string"), ("schedule_time", "string"),
+                    ("date_folder", "string"), ("execution_mode", "string"), ("run_id", "string")],
+        'status': "status = ?",
+        'mode': "execution_mode = ?",
+        'order': "ORDER BY timestamp DESC, id DESC",
+    },
+    # The per-file ledger; status is the file's outcome and mode that of the run it belongs to
+    "transfers": {
+        'query': """
+            SELECT timestamp, run_id, rel_path, outcome, bytes, stored_bytes, duration, method, error
+            FROM file_transfers
+        """,
+        'columns': [("timestamp", "string"), ("run_id", "string"), ("rel_path", "string"), ("outcome", "string"),
+                    ("bytes", "int64"), ("stored_bytes", "int64"), ("duration", "float64"), ("method", "string"),
+                    ("error", "string")],
+        'status': "outcome = ?",
+        'mode': "run_id IN (SELECT run_id FROM transfer_runs WHERE execution_mode = ?)",
+        'order': "ORDER BY id",
+    },
+}
+
+FORMATS = ("csv", "jsonl.gz", "parquet")
+
+
+def available_export_formats():
+    """Formats usable on this installation"""
+    return [fmt for fmt in FORMATS if fmt != "parquet" or pyarrow is not None]
+
+
+def export_format(path, requested=None):
+    """The format to write: requested if given, otherwise chosen from the file name"""
+    name = path.lower()
+    fmt = requested or ("jsonl.gz" if name.endswith(".gz") else
+                        "parquet" if name.endswith(".parquet") else "csv")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    if fmt == "parquet" and pyarrow is None:
+        raise ValueError("Parquet export needs the pyarrow package")
+    return fmt
+
+
+def export_query(dataset, filters=None):
+    """SQL and parameters for a dataset with the given status, execution_mode, date_from and date_to filters"""
+    spec = DATASETS[dataset]
+    conditions, params = log_filter_clause(filters or {}, spec['status'], spec['mode'])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"{spec['query']} {where} {spec['order']}", params
+
+
+def iter_chunks(cursor, chunk_rows):
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        yield rows
+
+
+def export_records(conn, path, dataset="operations", filters=None, fmt=None, chunk_rows=5000):
+    """Stream a dataset to path as CSV, gzip'd JSON lines or Parquet; returns the number of rows written.
+
+    Rows are read chunk_rows at a time and written as they arrive, so memory
+    use does not grow with the table. The file is written under a temporary
+    name and renamed when complete.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}'. Use one of: {', '.join(DATASETS)}")
+    fmt = export_format(path, fmt)
+    query, params = export_query(dataset, filters)
+    columns = DATASETS[dataset]['columns']
+    names = [name for name, _ in columns]
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    chunks = iter_chunks(cursor, max(1, int(chunk_rows)))
+
+    partial = path + ".part"
+    written = 0
+    try:
+        if fmt == "csv":
+            with open(partial, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(names)
+                for rows in chunks:
+                    writer.writerows(rows)
+                    written += len(rows)
+        elif fmt == "jsonl.gz":
+            with gzip.open(partial, 'wt', encoding='utf-8') as f:
+                for rows in chunks:
+                    f.writelines(json.dumps(dict(zip(names, row))) + "\n" for row in rows)
+                    written += len(rows)
+        else:
+            schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, kind in columns])
+            with parquet.ParquetWriter(partial, schema, compression="zstd") as writer:
+                for rows in chunks:
+                    # One row group per chunk
+                    writer.write_table(pyarrow.Table.from_arrays(
+                        [pyarrow.array(values, type=field.type) for values, field in zip(zip(*rows), schema)],
+                        schema=schema))
+                    written += len(rows)
+        os.replace(partial, path)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+    finally:
+        cursor.close()
+    return written
@@ -0,0 +1,45 @@
+import time
+from datetime import datetime
+
+
+class BatchWriter:
+    """Buffers rows and hands them to flush_func in batches.
+
+    A batch is flushed once it holds max_rows rows or max_seconds have passed
+    since the last flush, so a long run neither commits once per file nor
+    keeps its whole history in memory. flush_func(rows) is expected to write
+    the rows with executemany in a single transaction.
+    """
+
+    def __init__(self, flush_func, max_rows=1000, max_seconds=2.0):
+        self.flush_func = flush_func
+        self.max_rows = max(1, int(max_rows))
+        self.max_seconds = float(max_seconds)
+        self.rows = []
+        self.last_flush = time.monotonic()
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.max_rows or time.monotonic() - self.last_flush >= self.max_seconds:
+            self.flush()
+
+    def flush(self):
+        rows, self.rows = self.rows, []
+        self.last_flush = time.monotonic()
+        if rows:
+            self.flush_func(rows)
+
+
+def save_transfers(conn, run_id, rows):
+    """Write per-file ledger rows; rows are (rel_path, bytes, duration, outcome, error, method, stored_bytes).
+
+    stored_bytes is what the file takes at the destination, less than bytes when it was compressed.
+    """
+    if not rows:
+        return
+    timestamp = datetime.now().isoformat()
+    conn.executemany("""
+        INSERT INTO file_transfers (run_id, rel_path, bytes, duration, outcome, error, method, stored_bytes, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(run_id, rel_path, size, duration, outcome, error, method, stored_bytes, timestamp)
+          for rel_path, size, duration, outcome, error, method, stored_bytes in rows])
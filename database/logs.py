@@ -0,0 +1,74 @@
+from datetime import date, timedelta
+
+LOG_COLUMNS = """id, timestamp, operation_type, status, files_processed, date_folder,
+                 execution_mode, source_path, final_destination"""
+
+
+def log_filter_clause(filters, status_condition="status = ?", mode_condition="execution_mode = ?"):
+    """SQL conditions and parameters for the log filters: status, execution_mode, date_from and date_to.
+
+    Dates are 'YYYY-MM-DD' strings and both ends are inclusive; ValueError is
+    raised for a malformed date. Timestamps are ISO strings, so comparing them
+    as text is comparing them in time and can use the timestamp indexes.
+    Tables without status or execution_mode columns pass their own conditions.
+    """
+    conditions, params = [], []
+    if filters.get('status'):
+        conditions.append(status_condition)
+        params.append(filters['status'])
+    if filters.get('execution_mode'):
+        conditions.append(mode_condition)
+        params.append(filters['execution_mode'])
+    if filters.get('date_from'):
+        conditions.append("timestamp >= ?")
+        params.append(parse_date(filters['date_from']).isoformat())
+    if filters.get('date_to'):
+        conditions.append("timestamp < ?")
+        params.append((parse_date(filters['date_to']) + timedelta(days=1)).isoformat())
+    return conditions, params
+
+
+def parse_date(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Invalid date '{text}', use YYYY-MM-DD") from None
+
+
+def latest_log_id(conn):
+    """Id of the newest log entry, 0 for an empty log"""
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM file_operations").fetchone()[0]
+
+
+def fetch_log_page(conn, filters=None, before=None, limit=200):
+    """One page of log entries, newest first.
+
+    before is the (timestamp, id) of the last entry of the previous page; the
+    page continues from there through the index (keyset pagination), so paging
+    deep into the history costs the same as loading the first page.
+    """
+    conditions, params = log_filter_clause(filters or {})
+    if before is not None:
+        conditions.append("timestamp <= ? AND (timestamp < ? OR id < ?)")
+        params.extend((before[0], before[0], before[1]))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return conn.execute(f"""
+        SELECT {LOG_COLUMNS}
+        FROM file_operations
+        {where}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+    """, params + [limit]).fetchall()
+
+
+def fetch_new_logs(conn, after_id, up_to_id, filters=None):
+    """Entries with after_id < id <= up_to_id that match the filters, newest first"""
+    conditions, params = log_filter_clause(filters or {})
+    conditions.insert(0, "id > ? AND id <= ?")
+    params[:0] = [after_id, up_to_id]
+    return conn.execute(f"""
+        SELECT {LOG_COLUMNS}
+        FROM file_operations
+        WHERE {' AND '.join(conditions)}
+        ORDER BY timestamp DESC, id DESC
+    """, params).fetchall()
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+
+def load_manifest(conn, source_root, dest_root, rel_paths=None):
+    """Load the manifest for a source root copied to dest_root as {rel_path: (size, mtime_ns, content_hash)};
+    with rel_paths, only the entries for those files"""
+    cursor = conn.cursor()
+    if rel_paths is None:
+        cursor.execute("""
+            SELECT rel_path, size, mtime_ns, content_hash
+            FROM file_manifest
+            WHERE source_root = ? AND dest_root = ?
+        """, (source_root, dest_root))
+        return {row[0]: (row[1], row[2], row[3]) for row in cursor}
+
+    rel_paths = list(rel_paths)
+    manifest = {}
+    # In slices, to stay under SQLite's limit on query parameters
+    for start in range(0, len(rel_paths), 500):
+        chunk = rel_paths[start:start + 500]
+        cursor.execute(f"""
+            SELECT rel_path, size, mtime_ns, content_hash
+            FROM file_manifest
+            WHERE source_root = ? AND dest_root = ? AND rel_path IN ({", ".join("?" * len(chunk))})
+        """, [source_root, dest_root] + chunk)
+        manifest.update((row[0], (row[1], row[2], row[3])) for row in cursor)
+    return manifest
+
+
+def save_manifest_entries(conn, source_root, dest_root, entries):
+    """Insert or update manifest rows; entries are (rel_path, size, mtime_ns, content_hash)"""
+    if not entries:
+        return
+    synced = datetime.now().isoformat()
+    conn.executemany("""
+        INSERT INTO file_manifest (source_root, dest_root, rel_path, size, mtime_ns, content_hash, last_synced)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (source_root, dest_root, rel_path) DO UPDATE SET
+            size = excluded.size,
+            mtime_ns = excluded.mtime_ns,
+            content_hash = excluded.content_hash,
+            last_synced = excluded.last_synced
+    """, [(source_root, dest_root, rel_path, size, mtime_ns, content_hash, synced)
+          for rel_path, size, mtime_ns, content_hash in entries])
+
+
+def delete_manifest_entries(conn, source_root, dest_root, rel_paths):
+    """Forget files that no longer exist in the source"""
+    if not rel_paths:
+        return
+    conn.executemany("DELETE FROM file_manifest WHERE source_root = ? AND dest_root = ? AND rel_path = ?",
+                     [(source_root, dest_root, rel_path) for rel_path in rel_paths])
@@ -0,0 +1,184 @@
+def add_column_if_missing(cursor, table, column, definition):
+    """Add a column to a table created by an older version of the application"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def enable_incremental_vacuum(cursor):
+    """Version 1: let retention hand freed pages back to the file system a few at a time.
+
+    A new database is switched over before it has any pages; an existing one
+    needs a single full VACUUM, which runs here, once, rather than in a transfer.
+    """
+    cursor.execute("PRAGMA auto_vacuum")
+    if cursor.fetchone()[0] == 2:
+        return
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    cursor.execute("PRAGMA auto_vacuum")
+    if cursor.fetchone()[0] != 2:
+        print("Rebuilding the log database once to enable incremental vacuum...")
+        cursor.execute("VACUUM")
+
+
+def create_schema(cursor):
+    """Version 2: the tables as they were before the database was versioned.
+
+    Databases from those releases may have any subset of them, so every step
+    here is safe to run again on a database that already has it.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS file_operations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            source_path TEXT NOT NULL,
+            destination_path TEXT NOT NULL,
+            final_destination TEXT NOT NULL,
+            operation_type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            files_processed INTEGER,
+            error_message TEXT,
+            schedule_time TEXT,
+            date_folder TEXT,
+            execution_mode TEXT DEFAULT 'GUI'
+        )
+    """)
+    # Last known state of every source file, used by incremental runs to skip unchanged files
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS file_manifest (
+            source_root TEXT NOT NULL,
+            rel_path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            content_hash TEXT,
+            last_synced TEXT NOT NULL,
+            PRIMARY KEY (source_root, rel_path)
+        )
+    """)
+    # Digests recorded by verify mode, one row per transferred file
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS file_checksums (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            rel_path TEXT NOT NULL,
+            algorithm TEXT NOT NULL,
+            source_digest TEXT NOT NULL,
+            dest_digest TEXT,
+            verified INTEGER NOT NULL DEFAULT 0,
+            timestamp TEXT NOT NULL
+        )
+    """)
+    # Per-file ledger: which files a run transferred, how big they were and how long each took
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS file_transfers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            rel_path TEXT NOT NULL,
+            bytes INTEGER,
+            duration REAL,
+            outcome TEXT NOT NULL,
+            error TEXT,
+            method TEXT,
+            timestamp TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_transfers_run ON file_transfers (run_id)")
+    # One row per run; the ledger rows of a run that is not 'completed' are its resume checkpoint
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transfer_runs (
+            run_id TEXT PRIMARY KEY,
+            started TEXT NOT NULL,
+            finished TEXT,
+            status TEXT NOT NULL,
+            source_path TEXT NOT NULL,
+            final_destination TEXT NOT NULL,
+            operation_type TEXT NOT NULL,
+            date_folder TEXT,
+            execution_mode TEXT,
+            failed_files INTEGER DEFAULT 0
+        )
+    """)
+    # Where each run spent its time; 'worker' phases are summed over parallel threads
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS run_phases (
+            run_id TEXT NOT NULL,
+            phase TEXT NOT NULL,
+            seconds REAL NOT NULL,
+            calls INTEGER NOT NULL DEFAULT 1,
+            kind TEXT NOT NULL,
+            PRIMARY KEY (run_id, phase)
+        )
+    """)
+    # Small files written into tar bundles: which bundle holds each one and where
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS bundle_index (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            rel_path TEXT NOT NULL,
+            bundle_path TEXT NOT NULL,
+            member_offset INTEGER NOT NULL,
+            data_offset INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL,
+            timestamp TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bundle_index_path ON bundle_index (rel_path)")
+    add_column_if_missing(cursor, 'file_operations', 'run_id', 'TEXT')
+    add_column_if_missing(cursor, 'file_transfers', 'stored_bytes', 'INTEGER')
+    for column, definition in (('duration', 'REAL'), ('bytes_transferred', 'INTEGER'),
+                               ('bytes_per_sec', 'REAL'), ('files_per_sec', 'REAL')):
+        add_column_if_missing(cursor, 'transfer_runs', column, definition)
+
+
+def add_log_indexes(cursor):
+    """Version 3: indexes for the log view (newest first, filtered by status or mode) and for retention"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_operations_timestamp ON file_operations (timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_operations_status ON file_operations (status, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_operations_mode ON file_operations (execution_mode, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_checksums_run ON file_checksums (run_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transfer_runs_started ON transfer_runs (started)")
+
+
+def key_manifest_by_destination(cursor):
+    """Version 4: key the manifest by destination as well as source.
+
+    Jobs reading the same source into different destinations shared one
+    manifest, so the second one skipped files it had never copied. Rows from
+    before do not say where they were copied to and are dropped; the next
+    incremental run of each job copies everything once.
+    """
+    cursor.execute("DROP TABLE IF EXISTS file_manifest")
+    cursor.execute("""
+        CREATE TABLE file_manifest (
+            source_root TEXT NOT NULL,
+            dest_root TEXT NOT NULL,
+            rel_path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            content_hash TEXT,
+            last_synced TEXT NOT NULL,
+            PRIMARY KEY (source_root, dest_root, rel_path)
+        )
+    """)
+
+
+# Applied in order; the database's PRAGMA user_version is the number applied so far.
+# Append new steps at the end and never change one that has shipped.
+MIGRATIONS = [
+    enable_incremental_vacuum,
+    create_schema,
+    add_log_indexes,
+    key_manifest_by_destination,
+]
+
+
+def migrate(conn):
+    """Bring a database up to the current schema; each step is committed with its version so an interrupted upgrade resumes"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        cursor = conn.cursor()
+        step(cursor)
+        cursor.execute(f"PRAGMA user_version = {number}")
+        conn.commit()
+    return len(MIGRATIONS)
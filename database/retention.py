@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+# Per-run tables whose rows go with their transfer_runs row. bundle_index is kept: it is
+# the only way to find a file inside a bundle that is still on the destination.
+RUN_TABLES = ("file_transfers", "file_checksums", "run_phases")
+
+
+def delete_chunk(conn, table, where, params, chunk_rows):
+    """Delete up to chunk_rows rows matching where; returns the number deleted"""
+    cursor = conn.execute(f"""
+        DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT ?)
+    """, (*params, chunk_rows))
+    return cursor.rowcount
+
+
+def release_free_pages(conn, pages):
+    """Return up to pages free pages to the file system; returns the number released"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # Each execution frees one page; a single incremental_vacuum(N) would stop after its first step here
+    for _ in range(min(int(pages), free_before)):
+        conn.execute("PRAGMA incremental_vacuum(1)")
+    return free_before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def delete_in_chunks(db, table, where, params=(), chunk_rows=5000):
+    """Delete the rows matching where, chunk_rows per transaction; returns the number deleted.
+
+    Each chunk is a separate write on the writer thread, so a run logging at
+    the same time waits at most for one short chunk instead of one long delete.
+    """
+    chunk_rows = max(1, int(chunk_rows))
+    deleted = 0
+    while True:
+        count = db.call(delete_chunk, table, where, params, chunk_rows)
+        deleted += count
+        if count < chunk_rows:
+            return deleted
+
+
+def purge_old_records(db, days, chunk_rows=5000, vacuum_pages=2000):
+    """Delete log entries and finished runs older than days, then return up to vacuum_pages free pages to the disk.
+
+    Runs still marked 'running' are kept whatever their age. Returns the number
+    of rows deleted per table and the pages released as 'pages_vacuumed'.
+    """
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    deleted = {'file_operations': delete_in_chunks(db, 'file_operations', "timestamp < ?", (cutoff,), chunk_rows)}
+
+    runs = [row[0] for row in db.reader().execute(
+        "SELECT run_id FROM transfer_runs WHERE started < ? AND status != 'running'", (cutoff,))]
+    for table in RUN_TABLES:
+        deleted[table] = sum(delete_in_chunks(db, table, "run_id = ?", (run_id,), chunk_rows) for run_id in runs)
+    deleted['transfer_runs'] = delete_in_chunks(db, 'transfer_runs', "started < ? AND status != 'running'",
+                                                (cutoff,), chunk_rows)
+
+    # Bounded, so a large purge shrinks the file over several runs instead of stalling this one
+    deleted['pages_vacuumed'] = db.call(release_free_pages, vacuum_pages) if vacuum_pages else 0
+    return deleted
+
+
+def apply_retention(self, execution_mode="BATCH"):
+    """Purge records older than log_retention_days (0 keeps everything); never raises, so it cannot fail a run"""
+    days = self.config.get('log_retention_days', 90)
+    if not days:
+        return None
+    try:
+        deleted = purge_old_records(self.db, days, self.config.get('retention_chunk_rows', 5000),
+                                    self.config.get('retention_vacuum_pages', 2000))
+    except Exception as e:
+        print(f"[{execution_mode}] Log retention failed: {str(e)}")
+        return None
+    removed = {table: count for table, count in deleted.items() if count and table != 'pages_vacuumed'}
+    if removed or deleted['pages_vacuumed']:
+        print(f"[{execution_mode}] Log retention ({days} days): removed "
+              + (", ".join(f"{count} {table}" for table, count in removed.items()) or "nothing")
+              + f"; released {deleted['pages_vacuumed']} free pages")
+    return deleted
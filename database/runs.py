@@ -0,0 +1,53 @@
+from datetime import datetime
+
+
+def start_run(conn, run_id, source_path, final_destination, operation_type, date_folder, execution_mode):
+    """Record that a run has started (or restarted, when resuming) so it can be resumed if interrupted"""
+    now = datetime.now().isoformat()
+    conn.execute("""
+        INSERT INTO transfer_runs
+        (run_id, started, source_path, final_destination, operation_type, date_folder, execution_mode, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 'running')
+        ON CONFLICT (run_id) DO UPDATE SET status = 'running', finished = NULL
+    """, (run_id, now, source_path, final_destination, operation_type, date_folder, execution_mode))
+
+
+def finish_run(conn, run_id, status, failed_files=0, rates=None):
+    """Mark a run as completed or failed, storing its final throughput (a progress snapshot) if given"""
+    rates = rates or {}
+    conn.execute("""
+        UPDATE transfer_runs
+        SET status = ?, finished = ?, failed_files = ?, duration = ?, bytes_transferred = ?,
+            bytes_per_sec = ?, files_per_sec = ?
+        WHERE run_id = ?
+    """, (status, datetime.now().isoformat(), failed_files, rates.get('elapsed'), rates.get('bytes_done'),
+          rates.get('bytes_per_sec'), rates.get('files_per_sec'), run_id))
+
+
+def save_phases(conn, run_id, rows):
+    """Store the phase timings of a run; rows are (phase, seconds, calls, kind). A resumed run keeps the latest attempt's."""
+    conn.execute("DELETE FROM run_phases WHERE run_id = ?", (run_id,))
+    conn.executemany("INSERT INTO run_phases (run_id, phase, seconds, calls, kind) VALUES (?, ?, ?, ?, ?)",
+                     [(run_id,) + tuple(row) for row in rows])
+
+
+def load_run(conn, run_id):
+    """Return the stored settings of a run as a dict, or None if there is no such run"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT run_id, started, finished, status, source_path, final_destination,
+               operation_type, date_folder, execution_mode, failed_files
+        FROM transfer_runs
+        WHERE run_id = ?
+    """, (run_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip([column[0] for column in cursor.description], row))
+
+
+def completed_paths(conn, run_id):
+    """Relative paths the ledger shows as already transferred by a run"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT rel_path FROM file_transfers WHERE run_id = ? AND outcome = 'transferred'", (run_id,))
+    return {row[0] for row in cursor}
@@ -2,11 +2,15 @@ from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import smtplib
+import threading
 from tkinter import messagebox
+from emailer.notifier import Notifier
+
+_notifier_lock = threading.Lock()  # Parallel runs may ask for the notifier at the same time
 
 def send_notification_email(self, status, files_processed, duration, final_destination="", 
                               date_folder="", execution_mode="GUI", error_msg=None):
-        """Send email notification"""
+        """Queue an email notification for the background notifier; returns without waiting for the mail server"""
         try:
             # Get email configuration
             if self.gui_mode:
@@ -34,14 +38,10 @@ def send_notification_email(self, status, files_processed, duration, final_desti
                 print(f"[{execution_mode}] Email not configured, skipping notification")
                 return  # Email not configured
             
-            print(f"[{execution_mode}] Sending email notification...")
-            
-            msg = MIMEMultipart()
-            msg['From'] = sender_email
-            msg['To'] = recipient_email
+            print(f"[{execution_mode}] Queuing email notification...")
             
             if status == "SUCCESS":
-                msg['Subject'] = f"File Scheduler - {operation_type.title()} Operation Successful ({execution_mode})"
+                subject = f"File Scheduler - {operation_type.title()} Operation Successful ({execution_mode})"
                 body = f"""
 File {operation_type} operation completed successfully!
 
@@ -59,7 +59,7 @@ Details:
 This is an automated message from File Scheduler Application.
                 """
             else:
-                msg['Subject'] = f"File Scheduler - {operation_type.title()} Operation Failed ({execution_mode})"
+                subject = f"File Scheduler - {operation_type.title()} Operation Failed ({execution_mode})"
                 body = f"""
 File {operation_type} operation failed!
 
@@ -77,20 +77,28 @@ Please check the application logs for more details.
 This is an automated message from File Scheduler Application.
                 """
             
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Send email
-            server = smtplib.SMTP(smtp_server, int(smtp_port))
-            if use_tls:
-                server.starttls()
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, recipient_email, msg.as_string())
-            server.quit()
-            
-            print(f"[{execution_mode}] Email notification sent successfully")
+            settings = {'smtp_server': smtp_server, 'smtp_port': smtp_port, 'sender_email': sender_email,
+                        'sender_password': sender_password, 'recipient_email': recipient_email, 'use_tls': use_tls}
+            get_notifier(self, settings).send(subject, body, status, execution_mode)
             
         except Exception as e:
             print(f"[{execution_mode}] Failed to send email notification: {str(e)}")
+
+
+def get_notifier(self, settings):
+    """The notifier for these email settings, one per distinct settings and shared by every run using them"""
+    key = tuple(sorted(settings.items()))
+    with _notifier_lock:
+        notifier = self.notifiers.get(key)
+        if notifier is None:
+            notifier = self.notifiers[key] = Notifier(
+                settings,
+                retries=self.config.get('email_retries', 3),
+                retry_delay=self.config.get('email_retry_delay', 5),
+                keepalive=self.config.get('smtp_keepalive_seconds', 60),
+                digest_seconds=float(self.config.get('email_digest_minutes', 0)) * 60,
+            )
+        return notifier
     
 def test_email(self):
     """Test email configuration"""
@@ -0,0 +1,167 @@
+import time
+import queue
+import smtplib
+import threading
+from datetime import datetime
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+# Refusals that will not change on a retry
+PERMANENT_ERRORS = (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)
+
+_FLUSH = object()
+
+
+class Notifier:
+    """Sends notification emails from a background thread.
+
+    send() only queues the message, so a slow or unreachable mail server never
+    holds up a run. The SMTP connection (TLS and login included) is kept open
+    and reused for the next message until it has been idle for keepalive
+    seconds. A failed send is retried with exponential backoff, starting at
+    retry_delay seconds; a reused connection that the server has dropped is
+    replaced at once without counting as a retry.
+
+    With digest_seconds set, messages are collected and sent as one digest
+    email at most every digest_seconds instead of one email each.
+
+    smtp_factory(host, port, timeout=...) opens the connection; tests can pass
+    a fake, or point the settings at a local SMTP stand-in.
+    """
+
+    def __init__(self, settings, smtp_factory=smtplib.SMTP, retries=3, retry_delay=5.0, keepalive=60.0,
+                 digest_seconds=0.0, timeout=30.0, sleep=time.sleep):
+        self.settings = dict(settings)
+        self.smtp_factory = smtp_factory
+        self.retries = max(0, int(retries))
+        self.retry_delay = float(retry_delay)
+        self.keepalive = float(keepalive)
+        self.digest_seconds = float(digest_seconds)
+        self.timeout = timeout
+        self.sleep = sleep
+        self.server = None
+        self.last_used = 0.0
+        self.connections = 0
+        self.sent = 0
+        self.failed = 0
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self.thread.start()
+
+    def send(self, subject, body, status="SUCCESS", execution_mode="GUI"):
+        """Queue a notification; returns at once"""
+        self.queue.put((subject, body, status, execution_mode, datetime.now()))
+
+    def flush(self, timeout=None):
+        """Send everything queued so far, a pending digest included, and wait for it"""
+        done = threading.Event()
+        self.queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Send what is queued, then disconnect and stop the thread"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+    def _run(self):
+        digest = []
+        digest_due = None
+        while True:
+            waits = []
+            if self.server is not None:
+                waits.append(max(0.0, self.last_used + self.keepalive - time.monotonic()))
+            if digest_due is not None:
+                waits.append(max(0.0, digest_due - time.monotonic()))
+            try:
+                item = self.queue.get(timeout=min(waits) if waits else None)
+            except queue.Empty:
+                item = ()
+
+            if item is None or (item and item[0] is _FLUSH):
+                if digest:
+                    self._deliver(*self._digest(digest))
+                    digest, digest_due = [], None
+                if item is None:
+                    self._disconnect()
+                    return
+                item[1].set()
+                continue
+
+            if item:
+                if self.digest_seconds > 0:
+                    digest.append(item)
+                    if digest_due is None:
+                        digest_due = time.monotonic() + self.digest_seconds
+                else:
+                    self._deliver(*item[:4])
+            if digest_due is not None and time.monotonic() >= digest_due:
+                self._deliver(*self._digest(digest))
+                digest, digest_due = [], None
+            if self.server is not None and time.monotonic() - self.last_used >= self.keepalive:
+                self._disconnect()
+
+    def _digest(self, items):
+        """One (subject, body, status, execution_mode) combining the queued messages"""
+        failed = sum(1 for item in items if item[2] != "SUCCESS")
+        subject = f"File Scheduler - Digest: {len(items)} notification{'s' if len(items) != 1 else ''}"
+        if failed:
+            subject += f" ({failed} failed)"
+        sections = [f"[{queued.strftime('%Y-%m-%d %H:%M:%S')}] {item_subject}\n{body.strip()}"
+                    for item_subject, body, status, mode, queued in items]
+        separator = "\n\n" + "-" * 60 + "\n\n"
+        return subject, separator.join(sections), "ERROR" if failed else "SUCCESS", items[-1][3]
+
+    def _connect(self):
+        settings = self.settings
+        server = self.smtp_factory(settings['smtp_server'], int(settings['smtp_port']), timeout=self.timeout)
+        try:
+            if settings.get('use_tls', True):
+                server.starttls()
+            if settings.get('sender_password'):
+                server.login(settings['sender_email'], settings['sender_password'])
+        except BaseException:
+            server.close()
+            raise
+        self.connections += 1
+        return server
+
+    def _disconnect(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+        self.server = None
+
+    def _deliver(self, subject, body, status, execution_mode):
+        msg = MIMEMultipart()
+        msg['From'] = self.settings['sender_email']
+        msg['To'] = self.settings['recipient_email']
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'plain'))
+
+        attempt = 0
+        while True:
+            reused = self.server is not None
+            try:
+                if self.server is None:
+                    self.server = self._connect()
+                self.server.sendmail(self.settings['sender_email'], self.settings['recipient_email'], msg.as_string())
+                self.last_used = time.monotonic()
+                self.sent += 1
+                print(f"[{execution_mode}] Email notification sent successfully")
+                return True
+            except Exception as e:
+                self._disconnect()
+                if reused and isinstance(e, (smtplib.SMTPServerDisconnected, ConnectionError)):
+                    continue  # The server closed the idle connection; reconnect straight away
+                if isinstance(e, PERMANENT_ERRORS) or attempt >= self.retries:
+                    self.failed += 1
+                    print(f"[{execution_mode}] Failed to send email notification: {str(e)}")
+                    return False
+                delay = self.retry_delay * 2 ** attempt
+                attempt += 1
+                print(f"[{execution_mode}] Email notification failed ({str(e)}), retry {attempt}/{self.retries} in {delay:.0f}s")
+                self.sleep(delay)
@@ -0,0 +1,241 @@
+import os
+import sys
+import errno
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Not available on Windows
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Linux ioctl that shares the source extents with the destination (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+# errno values meaning "this kernel/filesystem can't do that", as opposed to a real I/O error
+_UNSUPPORTED = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY,
+                getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP)}
+
+# Fast paths that already failed for a (source device, destination device) pair
+_unsupported = set()
+_unsupported_lock = threading.Lock()
+_buffers = threading.local()
+
+
+def _supported(method, devices):
+    return (method, devices) not in _unsupported
+
+
+def _mark_unsupported(method, devices):
+    with _unsupported_lock:
+        _unsupported.add((method, devices))
+
+
+def _reflink(src_fd, dst_fd, size, chunk_size, throttle=None):
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd, dst_fd, size, chunk_size, throttle=None):
+    copied = 0
+    while True:
+        sent = os.copy_file_range(src_fd, dst_fd, chunk_size)
+        if sent == 0:
+            if copied == 0 and size > 0:
+                # Some pseudo filesystems report 0 bytes for non-empty files
+                raise OSError(errno.EINVAL, "copy_file_range copied nothing")
+            return
+        copied += sent
+        if throttle is not None:
+            throttle(sent)
+
+
+def _sendfile(src_fd, dst_fd, size, chunk_size, throttle=None):
+    offset = 0
+    while True:
+        sent = os.sendfile(dst_fd, src_fd, offset, chunk_size)
+        if sent == 0:
+            if offset == 0 and size > 0:
+                raise OSError(errno.EINVAL, "sendfile copied nothing")
+            return
+        offset += sent
+        if throttle is not None:
+            throttle(sent)
+
+
+def copy_chunk(src_fd, dst_fd, chunk_size, hashers=()):
+    """Copy the next chunk of up to chunk_size bytes from src_fd to dst_fd and feed it to hashers; returns its length, 0 at the end"""
+    buffer = getattr(_buffers, 'buffer', None)
+    if buffer is None or len(buffer) < chunk_size:
+        buffer = _buffers.buffer = bytearray(chunk_size)
+    view = memoryview(buffer)[:chunk_size]
+    with open(src_fd, 'rb', buffering=0, closefd=False) as src, open(dst_fd, 'wb', buffering=0, closefd=False) as dst:
+        read = src.readinto(view)
+        if not read:
+            return 0
+        chunk = view[:read]
+        # A raw write may take only part of the chunk, e.g. on a network share
+        written = 0
+        while written < read:
+            written += dst.write(chunk[written:])
+        for hasher in hashers:
+            hasher.update(chunk)
+        return read
+
+
+def _buffered(src_fd, dst_fd, size, chunk_size, hashers=(), throttle=None):
+    while True:
+        read = copy_chunk(src_fd, dst_fd, chunk_size, hashers)
+        if not read:
+            return
+        if throttle is not None:
+            throttle(read)
+
+
+def _fast_paths():
+    """Zero-copy methods available on this platform, in order of preference"""
+    methods = []
+    if fcntl is not None and sys.platform.startswith('linux'):
+        methods.append(("reflink", _reflink))
+    if hasattr(os, 'copy_file_range'):
+        methods.append(("copy_file_range", _copy_file_range))
+    # sendfile() only accepts a regular file as output on Linux
+    if hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+        methods.append(("sendfile", _sendfile))
+    return methods
+
+
+FAST_PATHS = _fast_paths()
+
+
+def copy_file(src, dst, stat=None, chunk_size=DEFAULT_CHUNK_SIZE, backend="auto", hashers=None, throttle=None):
+    """Copy a file's data and metadata (like shutil.copy2) and return the method used.
+
+    With backend "auto" the kernel fast paths are tried in order (reflink,
+    copy_file_range, sendfile) and the first one the filesystems accept is
+    used; "buffered" always copies through a reusable user-space buffer.
+    A fast path that fails for a pair of devices is not tried again for it.
+    When hashers are given the data has to pass through user space anyway, so
+    the buffered copy is used and every chunk is fed to each hasher on the way.
+    throttle(n) is called after every chunk of n bytes and may sleep to limit
+    bandwidth; a reflink moves no data, so it is not throttled.
+    """
+    chunk_size = int(chunk_size) if chunk_size else DEFAULT_CHUNK_SIZE
+    stat = stat or os.stat(src)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+    src_fd = os.open(src, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        dst_fd = os.open(dst, flags, 0o666)
+        try:
+            method = None
+            if backend == "auto" and not hashers:
+                devices = (stat.st_dev, os.fstat(dst_fd).st_dev)
+                for name, func in FAST_PATHS:
+                    if not _supported(name, devices):
+                        continue
+                    try:
+                        func(src_fd, dst_fd, stat.st_size, chunk_size, throttle)
+                        method = name
+                        break
+                    except OSError as e:
+                        if e.errno not in _UNSUPPORTED:
+                            raise
+                        _mark_unsupported(name, devices)
+                        # Start again from a clean destination before the next method
+                        os.lseek(src_fd, 0, os.SEEK_SET)
+                        os.lseek(dst_fd, 0, os.SEEK_SET)
+                        os.ftruncate(dst_fd, 0)
+
+            if method is None:
+                _buffered(src_fd, dst_fd, stat.st_size, chunk_size, hashers or (), throttle)
+                method = "buffered+hash" if hashers else "buffered"
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+    shutil.copystat(src, dst)
+    return method
+
+
+def _open_pair(src, dst):
+    src_fd = os.open(src, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        return src_fd, os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+    except BaseException:
+        os.close(src_fd)
+        raise
+
+
+def _close_pair(src_fd, dst_fd):
+    try:
+        os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+
+def _finish_copy(src_fd, dst_fd, src, dst):
+    _close_pair(src_fd, dst_fd)
+    shutil.copystat(src, dst)
+
+
+async def copy_file_async(offload, src, dst, stat=None, chunk_size=DEFAULT_CHUNK_SIZE, hashers=None, throttle=None):
+    """copy_file for the asyncio engine, with every blocking call run through offload(func, *args).
+
+    Opening, each chunk, and closing with the metadata copy are separate
+    calls, so a transfer holds an I/O thread only while one of them runs and
+    waits without one in between. The data always goes through the buffered
+    copy, one chunk per call. A file smaller than chunk_size gets a buffer one
+    byte larger than itself, so a short read tells that it was copied whole
+    without another call to find the end. throttle(n) is offloaded as well,
+    since it may sleep.
+    """
+    chunk_size = int(chunk_size) if chunk_size else DEFAULT_CHUNK_SIZE
+    size = stat.st_size if stat is not None else None
+    if size is not None:
+        chunk_size = min(chunk_size, size + 1)
+
+    src_fd, dst_fd = await offload(_open_pair, src, dst)
+    try:
+        copied = 0
+        while True:
+            read = await offload(copy_chunk, src_fd, dst_fd, chunk_size, hashers or ())
+            copied += read
+            if read and throttle is not None:
+                await offload(throttle, read)
+            # A short read past the size from the walk is the end of the file
+            if not read or (size is not None and read < chunk_size and copied >= size):
+                break
+    except BaseException:
+        await offload(_close_pair, src_fd, dst_fd)
+        raise
+
+    await offload(_finish_copy, src_fd, dst_fd, src, dst)
+    return "buffered+hash" if hashers else "buffered"
+
+
+def move_file(src, dst, stat=None, chunk_size=DEFAULT_CHUNK_SIZE, backend="auto", hashers=None, verify=None,
+              throttle=None):
+    """Move a file, renaming when possible and otherwise copying then deleting the source.
+
+    A rename never touches the data, so hashers and verify only apply to the
+    copy fallback; verify(dst) runs before the source is deleted and should
+    raise if the copy is not good. The source is not deleted if its size or
+    modification time changed during the copy; OSError is raised instead.
+    """
+    try:
+        os.replace(src, dst)
+        return "rename"
+    except OSError:
+        # Different device (or a rename the OS refused): fall back to copy + delete like shutil.move
+        stat = stat or os.stat(src)
+        method = copy_file(src, dst, stat, chunk_size, backend, hashers, throttle)
+        if verify is not None:
+            verify(dst)
+        current = os.stat(src)
+        if (current.st_size, current.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            raise OSError(errno.EBUSY, "Source changed while it was being moved, left in place", src)
+        os.unlink(src)
+        return method
@@ -0,0 +1,118 @@
+import os
+import time
+import uuid
+import tarfile
+from fileOperation.hashing import TimedHasher
+
+# Suffixes and tarfile write modes for bundle_compression
+COMPRESSION_MODES = {"": ("", "w"), "gz": (".gz", "w:gz"), "bz2": (".bz2", "w:bz2"), "xz": (".xz", "w:xz")}
+
+
+def bundle_name(sequence, compression=""):
+    """Bundle file name; the random part keeps a retried or resumed run from overwriting an earlier bundle"""
+    if compression not in COMPRESSION_MODES:
+        raise ValueError(f"Unknown bundle_compression '{compression}', use one of: "
+                         + ", ".join(repr(name) for name in COMPRESSION_MODES))
+    return f"bundle-{sequence:05d}-{uuid.uuid4().hex[:6]}.tar{COMPRESSION_MODES[compression][0]}"
+
+
+class _CountingReader:
+    """File wrapper that reports each chunk tarfile reads, for progress, throttling and hashing"""
+
+    def __init__(self, f, on_chunk, hasher=None):
+        self.f = f
+        self.on_chunk = on_chunk
+        self.hasher = hasher
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        if self.hasher is not None:
+            self.hasher.update(data)
+        if self.on_chunk is not None and data:
+            self.on_chunk(len(data))
+        return data
+
+
+def write_bundle(bundle_path, members, compression="", on_chunk=None, new_hasher=None):
+    """Write members, a list of (path, rel_path), into one tar bundle at bundle_path.
+
+    The bundle is written under a temporary name and renamed once complete, so
+    a bundle that exists is always whole. Returns one (rel_path, member_offset,
+    data_offset, size, mtime_ns, digest) tuple per member; the offsets are
+    positions in the uncompressed tar stream, so in a plain .tar a file can be
+    read straight from data_offset. digest is set when new_hasher is given.
+    """
+    partial = bundle_path + ".part"
+    index = []
+    try:
+        with tarfile.open(partial, COMPRESSION_MODES[compression][1], format=tarfile.GNU_FORMAT) as tar:
+            for path, rel_path in members:
+                with open(path, 'rb') as f:
+                    stat = os.fstat(f.fileno())
+                    info = tarfile.TarInfo(rel_path.replace(os.sep, '/'))
+                    info.size = stat.st_size
+                    info.mtime = int(stat.st_mtime)  # A float would add a pax header to every member
+                    info.mode = stat.st_mode & 0o7777
+                    hasher = new_hasher() if new_hasher is not None else None
+                    member_offset = tar.offset
+                    tar.addfile(info, _CountingReader(f, on_chunk, hasher))
+                # tar.offset is now past the data, which is padded to whole 512 byte blocks
+                blocks = (info.size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE
+                data_offset = tar.offset - blocks * tarfile.BLOCKSIZE
+                index.append((rel_path, member_offset, data_offset, info.size, stat.st_mtime_ns,
+                              hasher.hexdigest() if hasher is not None else None))
+        os.replace(partial, bundle_path)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+    return index
+
+
+def bundle_files(task, options, progress=None, limiter=None):
+    """Worker entry point for a bundle task: {'path': bundle_path, 'members': [(path, rel_path), ...]}"""
+    started = time.perf_counter()
+
+    def on_chunk(amount):
+        if progress is not None:
+            progress(amount)
+        if limiter is not None:
+            limiter.consume(amount)
+
+    new_hasher = None
+    if options['verify']:
+        new_hasher = lambda: TimedHasher(options['verify_algorithm'])
+    members = write_bundle(task['path'], task['members'], options['bundle_compression'], on_chunk, new_hasher)
+    return {'outcome': "transferred", 'method': "bundle", 'members': members,
+            'bytes': sum(member[3] for member in members), 'duration': time.perf_counter() - started}
+
+
+def read_member(entry):
+    """Return the contents of one bundled file, given its bundle_index row (a dict from find_bundled)"""
+    bundle_path = entry['bundle_path']
+    if bundle_path.endswith(".tar"):
+        # Plain tar: seek straight to the data instead of scanning the archive
+        with open(bundle_path, 'rb') as f:
+            f.seek(entry['data_offset'])
+            data = f.read(entry['size'])
+        if len(data) != entry['size']:
+            raise IOError(f"Bundle {bundle_path} is truncated")
+        return data
+    with tarfile.open(bundle_path, 'r:*') as tar:
+        member = tar.getmember(entry['rel_path'].replace(os.sep, '/'))
+        return tar.extractfile(member).read()
+
+
+def extract_member(entry, target_dir):
+    """Write one bundled file to target_dir under its original relative path; returns the path written"""
+    rel_path = os.path.normpath(entry['rel_path'])
+    if os.path.isabs(rel_path) or rel_path.split(os.sep)[0] == os.pardir:
+        raise ValueError(f"Refusing to extract outside the target folder: {entry['rel_path']}")
+    target = os.path.join(target_dir, rel_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(read_member(entry))
+    os.utime(target, (entry['mtime'], entry['mtime']))
+    return target
@@ -0,0 +1,123 @@
+import os
+import time
+import zlib
+import shutil
+from fileOperation.hashing import TimedHasher
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # Optional: pip install zstandard for "zstd"
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None  # Optional: pip install lz4 for "lz4"
+
+# File suffix and default level per codec
+CODECS = {"gzip": (".gz", 6), "zstd": (".zst", 3), "lz4": (".lz4", 0)}
+
+# Formats that are compressed already; compressing them again costs CPU and saves nothing
+DEFAULT_SKIP_EXTENSIONS = (
+    ".gz", ".tgz", ".zip", ".7z", ".rar", ".bz2", ".xz", ".zst", ".lz4", ".cab",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".mp3", ".mp4", ".m4a", ".mkv", ".avi", ".mov",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".pdf",
+)
+
+
+def available_codecs():
+    """Codec names usable on this installation"""
+    return [name for name in CODECS
+            if name == "gzip" or (name == "zstd" and zstandard is not None) or (name == "lz4" and lz4_frame is not None)]
+
+
+def check_codec(codec):
+    """Raise ValueError for a codec that is unknown or whose package is not installed"""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression '{codec}'. Use one of: {', '.join(CODECS)}")
+    if codec not in available_codecs():
+        raise ValueError(f"Compression '{codec}' needs the {'zstandard' if codec == 'zstd' else 'lz4'} package")
+
+
+class _Lz4Compressor:
+    """lz4.frame's compressor with the compress()/flush() interface of zlib's"""
+
+    def __init__(self, level):
+        self.compressor = lz4_frame.LZ4FrameCompressor(compression_level=level)
+        self.header = self.compressor.begin()
+
+    def compress(self, data):
+        header, self.header = self.header, b""
+        return header + self.compressor.compress(data)
+
+    def flush(self):
+        return self.header + self.compressor.flush()
+
+
+def new_compressor(codec, level=None):
+    """Streaming compressor with compress(data) and flush(), each returning bytes to write"""
+    level = CODECS[codec][1] if level is None else int(level)
+    if codec == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip header, readable by any gzip tool
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    return _Lz4Compressor(level)
+
+
+def new_decompressor(codec):
+    """Streaming decompressor with decompress(data)"""
+    if codec == "gzip":
+        return zlib.decompressobj(31)
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj()
+    return lz4_frame.LZ4FrameDecompressor()
+
+
+def should_compress(path, size, codec, skip_extensions=DEFAULT_SKIP_EXTENSIONS, min_size=512):
+    """Whether a file is worth compressing: not tiny and not a compressed format already"""
+    if not codec or size < min_size:
+        return False
+    return os.path.splitext(path)[1].lower() not in skip_extensions
+
+
+def compress_file(src, dst, codec, level=None, chunk_size=1024 * 1024, hashers=(), progress=None, throttle=None):
+    """Stream src through the codec into dst and return the number of bytes written.
+
+    hashers see the original data, progress(n) gets the original bytes read and
+    throttle(n) the compressed bytes written, since those are what cross the link.
+    zlib, zstandard and lz4 release the GIL while compressing, so parallel
+    workers compress on separate cores.
+    """
+    compressor = new_compressor(codec, level)
+    stored = 0
+    with open(src, 'rb') as source, open(dst, 'wb') as target:
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            for hasher in hashers:
+                hasher.update(chunk)
+            if progress is not None:
+                progress(len(chunk))
+            data = compressor.compress(chunk)
+            if data:
+                target.write(data)
+                stored += len(data)
+                if throttle is not None:
+                    throttle(len(data))
+        data = compressor.flush()
+        target.write(data)
+        stored += len(data)
+        if throttle is not None and data:
+            throttle(len(data))
+    shutil.copystat(src, dst)
+    return stored
+
+
+def hash_compressed(path, codec, algorithm, chunk_size=1024 * 1024):
+    """Return (hex digest, seconds) of the original contents of a compressed file"""
+    hasher = TimedHasher(algorithm)
+    decompressor = new_decompressor(codec)
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(decompressor.decompress(chunk))
+    return hasher.hexdigest(), time.perf_counter() - started
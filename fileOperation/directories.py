@@ -0,0 +1,63 @@
+import os
+import threading
+
+
+class DirectoryCache:
+    """Creates destination folders once each and remembers them, so files sharing a folder cost no extra calls.
+
+    os.makedirs(..., exist_ok=True) per file is a stat (and often a mkdir) on
+    the destination for every file, which on a network share is a round-trip
+    each. Here a folder is created by the first worker that needs it, parents
+    first; workers needing the same folder wait for that one mkdir instead of
+    racing it, and workers needing different folders create them in parallel.
+    Folders that already exist cost a single failed mkdir the first time.
+    """
+
+    def __init__(self, root):
+        self.lock = threading.Lock()
+        self.known = {os.path.normpath(root)}
+        self.pending = {}
+        self.created = 0
+
+    def is_known(self, directory):
+        """True once directory is known to exist; never touches the filesystem"""
+        return os.path.normpath(directory) in self.known
+
+    def ensure(self, directory):
+        """Make sure directory exists, creating any missing parents first"""
+        directory = os.path.normpath(directory)
+        if directory in self.known:
+            return
+        with self.lock:
+            if directory in self.known:
+                return
+            event = self.pending.get(directory)
+            owner = event is None
+            if owner:
+                event = self.pending[directory] = threading.Event()
+
+        if not owner:
+            event.wait()
+            if directory not in self.known:
+                self.ensure(directory)  # The creating worker failed; try again and report our own error
+            return
+
+        try:
+            parent = os.path.dirname(directory)
+            if parent and parent != directory:
+                self.ensure(parent)
+            try:
+                os.mkdir(directory)
+                created = 1
+            except OSError:
+                # Usually FileExistsError; a drive or share root may refuse mkdir in other ways
+                if not os.path.isdir(directory):
+                    raise
+                created = 0
+            with self.lock:
+                self.known.add(directory)
+                self.created += created
+        finally:
+            with self.lock:
+                del self.pending[directory]
+            event.set()
@@ -0,0 +1,164 @@
+import queue
+import asyncio
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+ENGINES = ("threads", "processes", "asyncio")
+
+_DONE = object()
+
+
+def create_executor(workers):
+    """Create the worker pool used for file transfers"""
+    return ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="transfer")
+
+
+def create_process_executor(workers, initializer=None, initargs=()):
+    """Create a pool of worker processes, for runs where hashing or compression need more than one core"""
+    return ProcessPoolExecutor(max_workers=max(1, int(workers)), initializer=initializer, initargs=initargs)
+
+
+def iter_transfers(executor, func, items, max_in_flight, stop_event=None, on_idle=None, idle_seconds=1.0):
+    """Run func(item) on the executor and yield (item, result, error) as each one finishes.
+
+    Only max_in_flight items are submitted at a time, so items can be a lazy
+    iterator. Once stop_event is set no new items are submitted, but the
+    transfers already running are still drained and reported. on_idle() is
+    called every idle_seconds while nothing finishes (e.g. during a large file).
+    """
+    items = iter(items)
+    pending = {}
+    exhausted = False
+
+    while True:
+        while not exhausted and len(pending) < max_in_flight and not (stop_event and stop_event.is_set()):
+            try:
+                item = next(items)
+            except StopIteration:
+                exhausted = True
+                break
+            pending[executor.submit(func, item)] = item
+
+        if not pending:
+            break
+
+        done, _ = wait(pending, timeout=idle_seconds if on_idle else None, return_when=FIRST_COMPLETED)
+        if not done:
+            on_idle()
+            continue
+        for future in done:
+            item = pending.pop(future)
+            error = future.exception()
+            yield item, (None if error else future.result()), error
+
+
+def run_batch(func, items):
+    """Run func over a batch of items in a worker process; returns (result, error) per item"""
+    outcomes = []
+    for item in items:
+        try:
+            outcomes.append((func(item), None))
+        except Exception as e:
+            outcomes.append((None, e))
+    return outcomes
+
+
+def iter_batches(executor, func, items, batch_size, max_in_flight, stop_event=None, on_idle=None, idle_seconds=1.0):
+    """Like iter_transfers, but ships items to the executor batch_size at a time.
+
+    For a process pool this pays the pickling and IPC round-trip once per batch
+    instead of once per file. func must be picklable (a module-level function).
+    Results are still yielded per item as (item, result, error).
+    """
+    def batches():
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    for batch, outcomes, error in iter_transfers(executor, partial(run_batch, func), batches(), max_in_flight,
+                                                 stop_event, on_idle, idle_seconds):
+        if error is not None:
+            # The whole batch was lost, e.g. a worker process died
+            outcomes = [(None, error)] * len(batch)
+        for item, (result, item_error) in zip(batch, outcomes):
+            yield item, result, item_error
+
+
+def iter_async_transfers(coro_func, items, max_in_flight, io_threads, on_idle=None, idle_seconds=1.0):
+    """Run coro_func(item, offload) for every item on an asyncio event loop and yield (item, result, error).
+
+    Up to max_in_flight transfers are in progress at once, each one just a
+    coroutine. Each transfer hands its blocking filesystem calls to
+    offload(func, *args), which runs them on a pool of io_threads threads.
+    As long as coro_func offloads each call on its own rather than the whole
+    transfer, a thread is held only while a call is running, and hundreds of
+    transfers can wait on a slow share without a thread each. The loop runs
+    on its own thread. Items are pulled from the (possibly blocking) iterator
+    on a helper thread. Results come back to the calling thread, which keeps
+    all database work where it was.
+    """
+    items = iter(items)
+    results = queue.Queue()
+    stopping = threading.Event()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        io_pool = ThreadPoolExecutor(max_workers=max(1, int(io_threads)), thread_name_prefix="async-io")
+        feeder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-feed")
+        slots = asyncio.Semaphore(max(1, int(max_in_flight)))
+        running = set()
+
+        def offload(func, *args):
+            return loop.run_in_executor(io_pool, partial(func, *args))
+
+        async def transfer(item):
+            try:
+                results.put((item, await coro_func(item, offload), None))
+            except Exception as e:
+                results.put((item, None, e))
+            finally:
+                slots.release()
+
+        try:
+            while not stopping.is_set():
+                await slots.acquire()
+                item = _DONE if stopping.is_set() else await loop.run_in_executor(feeder, next, items, _DONE)
+                if item is _DONE:
+                    slots.release()
+                    break
+                future = asyncio.ensure_future(transfer(item))
+                running.add(future)
+                future.add_done_callback(running.discard)
+            if running:
+                await asyncio.wait(running)
+        except Exception as e:
+            results.put(e)  # e.g. the walk failed; raised in the consumer below
+        finally:
+            feeder.shutdown(wait=True)
+            io_pool.shutdown(wait=True)
+            results.put(_DONE)
+
+    loop_thread = threading.Thread(target=lambda: asyncio.run(run()), name="async-loop", daemon=True)
+    loop_thread.start()
+    try:
+        while True:
+            try:
+                outcome = results.get(timeout=idle_seconds if on_idle else None)
+            except queue.Empty:
+                on_idle()
+                continue
+            if outcome is _DONE:
+                break
+            if isinstance(outcome, Exception):
+                raise outcome
+            yield outcome
+    finally:
+        # The consumer may stop early; let the transfers already started finish
+        stopping.set()
+        loop_thread.join()
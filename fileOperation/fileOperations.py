@@ -1,23 +1,51 @@
-import sqlite3
 import os
-import shutil
+import uuid
+import time
 from datetime import datetime
 import threading
+import contextlib
 import tkinter as tk
 from database.db import log_operation,refresh_logs
+from database.manifest import load_manifest, save_manifest_entries, delete_manifest_entries
+from database.ledger import BatchWriter, save_transfers
 from emailer.email import send_notification_email
 from utils.utils import get_date_folder_name
-
-
-def perform_file_operation(self):
-    try:
-        conn = sqlite3.connect(self.db_path)
-        print("DB connection opened in thread")
-    except Exception as e:
-        print(f"Failed to open DB connection: {e}")
-        return False
-
+from fileOperation.engine import ENGINES, create_executor, create_process_executor, iter_transfers, iter_batches, iter_async_transfers
+from fileOperation.walker import stream_files, scan_files
+from fileOperation.filters import path_filter
+from fileOperation.directories import DirectoryCache
+from fileOperation.bundler import bundle_files, bundle_name
+from fileOperation.compression import CODECS, DEFAULT_SKIP_EXTENSIONS, check_codec, should_compress, compress_file, hash_compressed
+from fileOperation.progress import ProgressTracker, ProgressReporter, format_bytes
+from fileOperation.timing import PhaseTimer, RunProfiler
+from fileOperation.mover import same_device, rename_tree, delete_sources, remove_empty_dirs
+from fileOperation.backends import copy_file, copy_file_async, move_file, DEFAULT_CHUNK_SIZE
+from fileOperation.throttle import BandwidthLimiter, SharedTokenBucket
+from fileOperation.hashing import TimedHasher, hash_file, new_hasher, DEFAULT_ALGORITHM
+from database.checksums import save_checksums
+from database.bundles import save_bundle_index
+from database.runs import start_run, finish_run, load_run, completed_paths, save_phases
+
+# The manifest always stores SHA-256 so digests stay comparable between runs
+MANIFEST_ALGORITHM = "sha256"
+
+
+def perform_file_operation(self, resume_run_id=None, executor=None, files=None):
+    """Run the configured copy/move. With resume_run_id, continue that earlier run,
+    skipping the files its ledger already shows as transferred. executor is a
+    thread pool shared with other runs, used instead of one of its own by the
+    threads engine. files limits the run to these (path, rel_path, stat) entries
+    below the source instead of walking it, as watch mode does."""
+    # Writes are queued for the database writer thread; reads use this thread's own connection
+    db = self.db
     execution_mode = "GUI" if self.gui_mode else "BATCH"
+    run_id = datetime.now().strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+    timer = PhaseTimer()
+    run_recorded = False
+    profiler = RunProfiler(self.config['profile_dir']) if self.config.get('profile_dir') else None
+    if profiler is not None and not profiler.start():
+        print(f"[{execution_mode}] Another run is being profiled, not profiling this one")
+        profiler = None
 
     try:
         if self.gui_mode:
@@ -35,13 +63,35 @@ def perform_file_operation(self):
                     self.root.after(0, lambda: tk.messagebox.showerror("Error", "Failed to map network drive"))
                     return False
                 unmapped = True
-                operation = self.operation_type.get()
+            operation = self.operation_type.get()
         else:
             source = self.config.get('source_path', '')
             base_destination = self.config.get('destination_path', '')
-            operation = self.operation_type
-            
-        print(f"[{execution_mode}] Starting file operation: {operation}")
+            operation = self.config.get('operation_type', 'copy')
+
+        workers = max(1, int(self.config.get('workers', 4)))
+        engine = self.config.get('engine', 'threads')
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'. Use one of: {', '.join(ENGINES)}")
+        incremental = bool(self.config.get('incremental', False))
+        retry_attempts = max(0, int(self.config.get('retry_attempts', 2)))
+        retry_delay = float(self.config.get('retry_delay', 5))
+        passes_filter = path_filter(self.config.get('include_patterns'), self.config.get('exclude_patterns'))
+
+        resumed = None
+        if resume_run_id:
+            resumed = load_run(db.reader(), resume_run_id)
+            if resumed is None:
+                raise ValueError(f"No run with id '{resume_run_id}' to resume")
+            if resumed['status'] == "completed":
+                print(f"[{execution_mode}] Run {resume_run_id} already completed, nothing to resume")
+                return True
+            run_id = resume_run_id
+            source = resumed['source_path']
+            operation = resumed['operation_type']
+            print(f"[{execution_mode}] Resuming run {run_id} (status: {resumed['status']})")
+
+        print(f"[{execution_mode}] Starting file operation: {operation} (run {run_id})")
         print(f"[{execution_mode}] Source: {source}")
         print(f"[{execution_mode}] Base destination: {base_destination}")
 
@@ -49,61 +99,353 @@ def perform_file_operation(self):
             error_msg = "Source or destination path not specified"
             print(f"[{execution_mode}] Error: {error_msg}")
 
-            log_operation(self, "ERROR", error_msg, 0, "Missing paths", "", execution_mode, conn=conn)
+            with timer.phase("db"):
+                log_operation(self, "ERROR", error_msg, 0, "Missing paths", "", execution_mode, run_id=run_id)
             return False
 
-        operation_date = datetime.now()
-        date_folder = self.get_date_folder_name(operation_date)
+        if resumed:
+            # Keep writing into the date folder the interrupted run started
+            date_folder = resumed['date_folder'] or ""
+            final_destination = resumed['final_destination']
+        else:
+            operation_date = datetime.now()
+            date_folder = self.get_date_folder_name(operation_date)
+            final_destination = os.path.join(base_destination, date_folder) if date_folder else base_destination
 
         if date_folder:
-            final_destination = os.path.join(base_destination, date_folder)
             print(f"[{execution_mode}] Date folder: {date_folder}")
         else:
-            final_destination = base_destination
             print(f"[{execution_mode}] No date folder")
 
         print(f"[{execution_mode}] Final destination: {final_destination}")
 
-        os.makedirs(final_destination, exist_ok=True)
+        # A destination that is not there any more holds none of the files the manifest says were copied
+        destination_existed = os.path.isdir(base_destination)
+        with timer.phase("mkdir"):
+            os.makedirs(final_destination, exist_ok=True)
         print(f"[{execution_mode}] Created destination directory")
+        dirs = DirectoryCache(final_destination)
+
+        with timer.phase("db"):
+            db.call(start_run, run_id, source, final_destination, operation, date_folder, execution_mode)
+            already_done = completed_paths(db.reader(), run_id) if resumed else set()
+        run_recorded = True
+        if already_done:
+            print(f"[{execution_mode}] {len(already_done)} files were already transferred by this run")
 
         files_processed = 0
+        skipped_unchanged = 0
         start_time = datetime.now()
 
-        if os.path.isfile(source):
-            files_to_process = [source]
+        if incremental and operation != "copy":
+            print(f"[{execution_mode}] Incremental mode only applies to copy operations, transferring all files")
+            incremental = False
+
+        bundling = bool(self.config.get('bundle_small_files', False))
+        if bundling and operation != "copy":
+            print(f"[{execution_mode}] Bundling only applies to copy operations, transferring files individually")
+            bundling = False
+
+        source_root = os.path.abspath(source)
+        # The base destination, not the date folder: each day's folder only gets what changed since the last run
+        dest_root = os.path.abspath(base_destination)
+        with timer.phase("db"):
+            if not incremental or not destination_existed:
+                manifest = {}
+            else:
+                # A file list only needs the entries of its own files, not the whole source's
+                manifest = load_manifest(db.reader(), source_root, dest_root,
+                                         None if files is None else [rel_path for _, rel_path, _ in files])
+        options = transfer_options(self, operation, incremental)
+        if options['verify']:
+            new_hasher(options['verify_algorithm'])  # Fail the run up front on an unknown algorithm
+        if bundling:
+            bundle_name(0, options['bundle_compression'])  # Likewise for an unknown compression
+        if options['compression']:
+            check_codec(options['compression'])
+        limiter = BandwidthLimiter(self.config.get('bandwidth', {}))
+        if limiter.enabled:
+            print(f"[{execution_mode}] Bandwidth limits (bytes/sec, global/per worker): {limiter.limits[0] or 'unlimited'}/{limiter.limits[1] or 'unlimited'}")
+        else:
+            limiter = None
+        copy_methods = {}
+        bundles_written = 0
+        compressed_bytes = compressed_stored = 0
+        hash_seconds = 0.0
+        transfer_seconds = 0.0
+        walk_errors = []
+
+        batch_rows = self.config.get('ledger_batch_rows', 1000)
+        batch_seconds = self.config.get('ledger_flush_seconds', 2.0)
+        bundle_writer = BatchWriter(timer.wrap("db", lambda rows: db.write(save_bundle_index, run_id, rows)), batch_rows, batch_seconds)
+
+        def write_ledger(rows):
+            # The index goes first: once the ledger calls a bundled file transferred, a resume skips it.
+            # The writer commits in queue order, so queuing the index first is enough.
+            bundle_writer.flush()
+            db.write(save_transfers, run_id, rows)
+
+        ledger = BatchWriter(timer.wrap("db", write_ledger), batch_rows, batch_seconds)
+        manifest_writer = BatchWriter(timer.wrap("db", lambda rows: db.write(save_manifest_entries, source_root, dest_root, rows)),
+                                      batch_rows, batch_seconds)
+        checksum_writer = BatchWriter(timer.wrap("db", lambda rows: db.write(save_checksums, run_id, rows)), batch_rows, batch_seconds)
+
+        delete_errors = []
+        changed_sources = []
+        timed_delete = timer.wrap("delete", delete_sources)
+        timed_flush = timer.wrap("db", db.flush)
+
+        def delete_copied(copied):
+            # Sources are only deleted once their ledger rows are committed
+            ledger.flush()
+            timed_flush()
+            errors, changed = timed_delete(copied)
+            delete_errors.extend(errors)
+            changed_sources.extend(changed)
+
+        deleter = BatchWriter(delete_copied, batch_rows, batch_seconds)
+
+        if operation == "move" and os.path.isdir(source):
+            on_same_device = same_device(source, final_destination)
+            # A folder renamed in one step would take files along that the filters or the file list leave out
+            if (on_same_device and self.config.get('move_rename_subtrees', True)
+                    and passes_filter is None and files is None):
+                # Rename whole folders in one step; whatever cannot be renamed is moved file by file below
+                print(f"[{execution_mode}] Source and destination are on the same filesystem, renaming folders")
+                for rel_path, renamed, error in timed_iter(timer, "rename", rename_tree(source, final_destination)):
+                    if error is not None:
+                        print(f"[{execution_mode}] Could not rename {rel_path}, moving its files individually: {error}")
+                        continue
+                    files_processed += renamed
+                    copy_methods["rename"] = copy_methods.get("rename", 0) + renamed
+                    ledger.add((rel_path, None, None, "transferred", None, "rename-tree" if renamed != 1 else "rename", None))
+            elif not on_same_device:
+                # Different devices: copy in parallel, verify, and only then delete the sources in batches
+                print(f"[{execution_mode}] Source and destination are on different filesystems, copying then deleting")
+                options['operation'] = "copy"
+                options['delete_source'] = True
+
+        tracker = ProgressTracker()
+        reporter = ProgressReporter(self, tracker, execution_mode, self.config.get('progress_interval', 5))
+
+        if files is not None:
+            discovered = iter(files)
+        elif os.path.isfile(source):
+            discovered = iter([(source, os.path.basename(source), os.stat(source))])
+        else:
+            discovered = stream_files(source, self.config.get('walk_queue_size', 1000), onerror=walk_errors.append,
+                                      on_finish=lambda seconds: timer.add("walk", seconds))
+            if self.config.get('progress_precount', False):
+                # A metadata-only walk racing ahead of the copy gives exact totals for the percentage and ETA
+                threading.Thread(target=precount, args=(source, tracker), name="precount", daemon=True).start()
+
+        bundle_max_file_size = int(self.config.get('bundle_max_file_size', 65536))
+        bundle_size = int(self.config.get('bundle_size', 64 * 1024 * 1024))
+        bundle_max_files = int(self.config.get('bundle_max_files', 10000))
+        bundle_count = [0]
+
+        def bundle_task(members):
+            bundle_count[0] += 1
+            path = os.path.join(final_destination, bundle_name(bundle_count[0], options['bundle_compression']))
+            return {'path': path, 'dest': path, 'rel_path': os.path.basename(path), 'stat': None, 'previous': None,
+                    'members': members}
+
+        def tasks():
+            members, members_size = [], 0
+            for file_path, rel_path, stat in discovered:
+                previous = manifest.pop(rel_path, None)
+                if rel_path in already_done or (passes_filter is not None and not passes_filter(rel_path)):
+                    continue
+                tracker.discovered(stat.st_size if stat else 0)
+                unchanged = previous is not None and stat is not None and (stat.st_size, stat.st_mtime_ns) == previous[:2]
+                if bundling and stat is not None and stat.st_size <= bundle_max_file_size and not unchanged:
+                    members.append((file_path, rel_path))
+                    members_size += stat.st_size
+                    if members_size >= bundle_size or len(members) >= bundle_max_files:
+                        yield bundle_task(members)
+                        members, members_size = [], 0
+                    continue
+                yield {
+                    'path': file_path,
+                    'dest': os.path.join(final_destination, rel_path),
+                    'rel_path': rel_path,
+                    'stat': stat,
+                    'previous': previous,
+                }
+            tracker.walk_finished()
+            if members:
+                yield bundle_task(members)
+
+        def work(task):
+            if 'members' in task:
+                return bundle_files(task, options, tracker.add_bytes, limiter)
+            return process_file(task, options, limiter, tracker.add_bytes, dirs)
+        if profiler is not None:
+            work = profiler.wrap(work)
+
+        if engine == "processes":
+            # Each worker process gets its own folder cache, and all of them draw on one shared global bandwidth
+            # budget; bytes are counted for progress as each batch comes back
+            batch_size = max(1, int(self.config.get('process_batch_size', 32)))
+            bandwidth = shared_bucket = None
+            if limiter is not None:
+                bandwidth = self.config.get('bandwidth', {})
+                shared_bucket = SharedTokenBucket(limiter.limits[0])
+            executor = create_process_executor(workers, init_worker_process,
+                                               (options, bandwidth, shared_bucket, final_destination))
+            run_tasks = lambda items: iter_batches(executor, process_task, items, batch_size, workers * 2,
+                                                   on_idle=reporter.report)
+            if profiler is not None:
+                print(f"[{execution_mode}] Profiling covers the main process only with the process engine")
+        elif engine == "asyncio":
+            # Hundreds of transfers in flight on one event loop; blocking calls go to a bounded thread pool
+            in_flight = max(1, int(self.config.get('async_in_flight', 256)))
+            io_threads = max(1, int(self.config.get('async_io_threads', 32)))
+
+            def profiled_calls(offload):
+                return lambda func, *args: offload(profiler.wrap(func), *args)
+
+            async def work_async(task, offload):
+                if profiler is not None:
+                    offload = profiled_calls(offload)
+                if 'members' in task:
+                    return await offload(bundle_files, task, options, tracker.add_bytes, limiter)
+                return await process_file_async(task, options, offload, limiter, tracker.add_bytes, dirs)
+
+            executor = contextlib.nullcontext()
+            run_tasks = lambda items: iter_async_transfers(work_async, items, in_flight, io_threads, on_idle=reporter.report)
+        else:
+            pool = executor if executor is not None else create_executor(workers)
+            # A shared pool stays open for the other runs using it
+            executor = contextlib.nullcontext() if executor is not None else pool
+            run_tasks = lambda items: iter_transfers(pool, work, items, workers * 2, on_idle=reporter.report)
+
+        if engine == "asyncio":
+            print(f"[{execution_mode}] Streaming files to the asyncio engine ({in_flight} in flight, {io_threads} I/O threads)")
         else:
-            files_to_process = []
-            for root, _, files in os.walk(source):
-                for file in files:
-                    files_to_process.append(os.path.join(root, file))
-        print(f"[{execution_mode}] Found {len(files_to_process)} files to process")
-
-        for file_path in files_to_process:
-            try:
-                if os.path.isfile(source):
-                    dest_file = os.path.join(final_destination, os.path.basename(file_path))
-                else:
-                    rel_path = os.path.relpath(file_path, source)
-                    dest_file = os.path.join(final_destination, rel_path)
-                    os.makedirs(os.path.dirname(dest_file), exist_ok=True)
-
-                if operation == "copy":
-                    shutil.copy2(file_path, dest_file)
-                else:
-                    shutil.move(file_path, dest_file)
-
-                files_processed += 1
-
-                if files_processed % 10 == 0:
-                    print(f"[{execution_mode}] Processed {files_processed} files...")
-
-            except Exception as e:
-                error_msg = f"Failed to {operation} {file_path}: {str(e)}"
-                print(f"[{execution_mode}] File error: {error_msg}")
-
-                log_operation(self, "ERROR", error_msg, files_processed, str(e), date_folder, execution_mode, conn=conn)
-                return False
+            print(f"[{execution_mode}] Streaming files to {workers} {'worker processes' if engine == 'processes' else 'workers'}")
+
+        pending = tasks()
+        failed = []
+        attempt = 0
+        worker_folders = 0  # Created by worker processes, whose folder caches are their own
+        transfer_started = time.perf_counter()
+        try:
+            with executor:
+                while True:
+                    failed = []
+                    for task, result, error in run_tasks(pending):
+                        reporter.report()
+                        if error is not None:
+                            # Keep going; failed files are retried once everything else is done
+                            failed.append((task, error))
+                            print(f"[{execution_mode}] File error: Failed to {operation} {task['path']}: {str(error)}")
+                            size = task['stat'].st_size if task['stat'] else None
+                            ledger.add((task['rel_path'], size, None, "failed", str(error), None, None))
+                            continue
+
+                        if engine == "processes":
+                            tracker.add_bytes(result['bytes'])
+                            worker_folders += result['folders_created']
+
+                        if 'members' in task:
+                            # One bundle holds many small files; record each of them
+                            for rel_path, member_offset, data_offset, size, mtime_ns, digest in result['members']:
+                                bundle_writer.add((rel_path, task['path'], member_offset, data_offset, size, mtime_ns / 1e9))
+                                ledger.add((rel_path, size, None, "transferred", None, "bundle", None))
+                                if incremental:
+                                    manifest_writer.add((rel_path, size, mtime_ns, None))
+                                if digest:
+                                    checksum_writer.add((rel_path, options['verify_algorithm'], digest, None, False))
+                                tracker.file_done()
+                            files_processed += len(result['members'])
+                            copy_methods["bundle"] = copy_methods.get("bundle", 0) + len(result['members'])
+                            bundles_written += 1
+                            timer.add("copy", result['duration'])
+                            continue
+
+                        if incremental:
+                            manifest_writer.add((task['rel_path'],) + result['entry'])
+                        if result['hash_seconds']:
+                            timer.add("hash", result['hash_seconds'])
+
+                        if result['outcome'] == "skipped":
+                            tracker.skipped(task['stat'].st_size if task['stat'] else 0)
+                            skipped_unchanged += 1
+                            continue
+
+                        tracker.file_done()
+
+                        files_processed += 1
+                        timer.add("mkdir", result['mkdir_seconds'])
+                        timer.add("copy", result['duration'] - result['mkdir_seconds'])
+                        if profiler is not None:
+                            profiler.record_latency(result['duration'])
+                        copy_methods[result['method']] = copy_methods.get(result['method'], 0) + 1
+                        hash_seconds += result['hash_seconds']
+                        transfer_seconds += result['duration']
+                        ledger.add((task['rel_path'], result['bytes'], result['duration'], "transferred", None, result['method'],
+                                    result['stored_bytes']))
+                        if result['method'] in CODECS:
+                            compressed_bytes += result['bytes']
+                            compressed_stored += result['stored_bytes']
+                        if options['delete_source']:
+                            # With the size and mtime it was copied at, so a file written to since is kept
+                            deleter.add((task['path'],) + result['entry'][:2])
+                        if result['digest']:
+                            checksum_writer.add((task['rel_path'], options['verify_algorithm'], result['digest'],
+                                                 result['dest_digest'], result['dest_digest'] is not None))
+
+                    if not failed or attempt >= retry_attempts:
+                        break
+                    attempt += 1
+                    ledger.flush()
+                    print(f"[{execution_mode}] Retrying {len(failed)} failed files in {retry_delay:g}s "
+                          f"(attempt {attempt} of {retry_attempts})")
+                    time.sleep(retry_delay)
+                    # Stat again: the file may have changed while it was locked
+                    pending = [dict(task, stat=None) for task, _ in failed]
+        finally:
+            timer.add("transfer", time.perf_counter() - transfer_started)
+            if hasattr(discovered, 'close'):
+                discovered.close()
+            # Flush even when the run dies half way: the ledger is the resume checkpoint
+            for writer in (ledger, manifest_writer, checksum_writer, bundle_writer, deleter):
+                writer.flush()
+
+        reporter.report(force=True)
+        final_rates = tracker.snapshot()
+
+        # Not for a file list: its folders may be filling up again already
+        if operation == "move" and os.path.isdir(source) and files is None:
+            with timer.phase("delete"):
+                remove_empty_dirs(source)
+        for delete_error in delete_errors:
+            print(f"[{execution_mode}] Copied but could not delete source: {delete_error}")
+        for path in changed_sources:
+            print(f"[{execution_mode}] Source changed after it was copied, left in place: {path}")
+
+        for walk_error in walk_errors:
+            print(f"[{execution_mode}] Could not scan directory: {walk_error}")
+
+        if failed:
+            errors = [f"Failed to {operation} {task['path']}: {str(error)}" for task, error in failed]
+            error_msg = f"{len(failed)} files failed after {retry_attempts} retries; resume with --resume {run_id}"
+            print(f"[{execution_mode}] Error: {error_msg}")
+            with timer.phase("db"):
+                db.write(finish_run, run_id, "failed", len(failed), final_rates)
+                log_operation(self, "ERROR", error_msg, files_processed, "\n".join(errors), date_folder, execution_mode, run_id=run_id)
+            with timer.phase("email"):
+                send_notification_email(self, "ERROR", files_processed, 0, final_destination, date_folder, execution_mode, error_msg)
+            return False
+
+        # Whatever is left in the manifest was not seen in this walk, so it was deleted from the source.
+        # If part of the tree could not be scanned, or only a file list was given, we cannot tell, so keep those entries.
+        deleted = 0
+        if incremental and not walk_errors and files is None:
+            deleted = len(manifest)
+            with timer.phase("db"):
+                db.write(delete_manifest_entries, source_root, dest_root, list(manifest))
 
         if self.gui_mode and unmapped:
             self.unmap_network_drive(network_drive)
@@ -116,12 +458,44 @@ def perform_file_operation(self):
             success_msg += f" to date folder '{date_folder}'"
 
         details = f"Processed {files_processed} files in {duration:.2f} seconds"
+        if incremental:
+            details += f" ({files_processed} transferred, {skipped_unchanged} skipped unchanged, {deleted} deleted)"
+        if already_done:
+            details += f"; resumed run, {len(already_done)} files were transferred earlier"
+        if walk_errors:
+            details += f"; {len(walk_errors)} directories could not be scanned"
+        if delete_errors:
+            details += f"; {len(delete_errors)} source files were copied but could not be deleted"
+        if changed_sources:
+            details += f"; {len(changed_sources)} source files changed after they were copied and were left in place"
+        if dirs.created + worker_folders:
+            details += f"; {dirs.created + worker_folders} folders created"
+        if bundles_written:
+            details += f"; {copy_methods['bundle']} small files written into {bundles_written} bundles"
+        if compressed_bytes:
+            details += (f"; {options['compression']} compressed {format_bytes(compressed_bytes)} to "
+                        f"{format_bytes(compressed_stored)} ({compressed_bytes / max(compressed_stored, 1):.1f}x)")
+        details += (f"; {format_bytes(final_rates['bytes_done'])} at {format_bytes(final_rates['bytes_per_sec'])}/s, "
+                    f"{final_rates['files_per_sec']:.1f} files/s")
+        if copy_methods:
+            details += "; copy methods: " + ", ".join(f"{name}={count}" for name, count in sorted(copy_methods.items()))
+        if options['verify'] or options['incremental_hash']:
+            # Hashing runs in parallel workers, so compare against total worker time rather than wall time
+            share = hash_seconds / transfer_seconds * 100 if transfer_seconds else 0.0
+            details += f"; hashing took {hash_seconds:.2f}s across workers ({share:.1f}% of transfer time)"
+            if options['verify']:
+                details += f" ({options['verify_algorithm']}{', read back' if options['verify_readback'] else ''})"
         print(f"[{execution_mode}] Success: {success_msg}")
         print(f"[{execution_mode}] {details}")
 
-        log_operation(self, "SUCCESS", success_msg, files_processed, details, date_folder, execution_mode, conn=conn)
+        with timer.phase("db"):
+            db.write(finish_run, run_id, "completed", 0, final_rates)
+            log_operation(self, "SUCCESS", success_msg, files_processed, details, date_folder, execution_mode, run_id=run_id)
 
-        send_notification_email(self, "SUCCESS", files_processed, duration, final_destination, date_folder, execution_mode)
+        # A file list is one of many micro-batches; failures are still mailed, successes only when asked for
+        if files is None or self.config.get('watch_batch_email', False):
+            with timer.phase("email"):
+                send_notification_email(self, "SUCCESS", files_processed, duration, final_destination, date_folder, execution_mode)
 
         if self.gui_mode:
             self.root.after(0, lambda: self.status_var.set(f"Operation completed: {files_processed} files processed"))
@@ -133,9 +507,13 @@ def perform_file_operation(self):
         error_msg = f"Operation failed: {str(e)}"
         print(f"[{execution_mode}] Exception: {error_msg}")
 
-        log_operation(self, "ERROR", error_msg, 0, str(e), date_folder if 'date_folder' in locals() else "", execution_mode, conn=conn)
+        if run_recorded:
+            db.write(finish_run, run_id, "failed")
+        with timer.phase("db"):
+            log_operation(self, "ERROR", error_msg, 0, str(e), date_folder if 'date_folder' in locals() else "", execution_mode, run_id=run_id)
 
-        send_notification_email(self, "ERROR", 0, 0, "", "", execution_mode, str(e))
+        with timer.phase("email"):
+            send_notification_email(self, "ERROR", 0, 0, "", "", execution_mode, str(e))
 
         if self.gui_mode:
             self.root.after(0, lambda: self.status_var.set(f"Error: {error_msg}"))
@@ -143,9 +521,308 @@ def perform_file_operation(self):
         return False
 
     finally:
-        if conn:
-            conn.close()
-            print("DB connection closed in thread")
+        record_timings(db, run_id, timer, profiler, execution_mode, run_recorded)
+
+
+def record_timings(db, run_id, timer, profiler, execution_mode, run_recorded):
+    """Store the phase timings of a run and write its profile; never fails the run"""
+    try:
+        with timer.phase("db"):
+            db.flush()  # The run is only over once everything it logged is committed
+        if profiler is not None:
+            profiler.stop()
+        print(f"[{execution_mode}] Phase timings: {timer.summary()}")
+        if run_recorded:
+            db.call(save_phases, run_id, timer.rows())
+        if profiler is not None:
+            stats_path, latency_path = profiler.write(run_id)
+            print(f"[{execution_mode}] Profile written to {stats_path}, latency histogram to {latency_path}")
+    except Exception as e:
+        print(f"[{execution_mode}] Could not record timings: {e}")
+
+
+def timed_iter(timer, name, iterable):
+    """Yield from iterable, adding the time spent producing each item to the named phase"""
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            timer.add(name, time.perf_counter() - started, 0)
+            return
+        timer.add(name, time.perf_counter() - started)
+        yield item
+
+
+def transfer_options(self, operation, incremental=False):
+    """Collect the per-file settings for a run into a plain dict handed to process_file"""
+    return {
+        'operation': operation,
+        # Manifest hashes are only used by incremental runs; computing them otherwise would also rule out zero-copy
+        'incremental_hash': incremental and bool(self.config.get('incremental_hash', False)),
+        'copy_backend': self.config.get('copy_backend', 'auto'),
+        'copy_chunk_size': int(self.config.get('copy_chunk_size', DEFAULT_CHUNK_SIZE)),
+        'verify': bool(self.config.get('verify', False)),
+        'verify_algorithm': self.config.get('verify_algorithm', DEFAULT_ALGORITHM),
+        'verify_readback': bool(self.config.get('verify_readback', False)),
+        'bundle_compression': self.config.get('bundle_compression', ''),
+        'compression': self.config.get('compression', ''),
+        'compression_level': self.config.get('compression_level'),
+        'compression_min_size': int(self.config.get('compression_min_size', 512)),
+        'compression_skip_extensions': tuple(extension.lower() for extension in
+                                             self.config.get('compression_skip_extensions', DEFAULT_SKIP_EXTENSIONS)),
+        'delete_source': False,
+    }
+
+
+def process_file(task, options, limiter=None, progress=None, dirs=None):
+    """Transfer one file unless its manifest entry shows it is unchanged.
+
+    task is a dict with the source 'path', 'dest' file, 'rel_path', the 'stat'
+    result from the walk (None if it could not be read) and 'previous', the
+    manifest entry from the last run or None. Returns a dict with the 'outcome'
+    ("transferred" or "skipped"), the new manifest 'entry' (size, mtime_ns,
+    content_hash), the copy 'method' used, the 'bytes' transferred, the
+    'duration' in seconds (of which 'mkdir_seconds' went to creating the
+    destination folder), the 'stored_bytes' written (fewer than 'bytes' when
+    compressed, in which case 'method' is the codec and the destination file
+    gets the codec's suffix), and for verify mode the 'digest', 'dest_digest'
+    and 'hash_seconds' spent hashing. limiter is an optional BandwidthLimiter,
+    progress(n) is called as each chunk of n bytes is copied, and dirs is the
+    run's DirectoryCache (without one the folder is created with os.makedirs).
+    """
+    started = time.perf_counter()
+    file_path = task['path']
+    stat = task['stat'] or os.stat(file_path)
+    skipped, content_hash, hash_seconds = check_unchanged(file_path, stat, task['previous'], options)
+    if skipped is not None:
+        return skipped
+    verify_hasher, manifest_hasher, hashers = transfer_hashers(options, content_hash)
+
+    result = {'outcome': "transferred", 'bytes': stat.st_size, 'digest': None, 'dest_digest': None}
+
+    mkdir_started = time.perf_counter()
+    if dirs is not None:
+        dirs.ensure(os.path.dirname(task['dest']))
+    else:
+        os.makedirs(os.path.dirname(task['dest']), exist_ok=True)
+    result['mkdir_seconds'] = time.perf_counter() - mkdir_started
+
+    codec = options['compression']
+    compress = options['operation'] == "copy" and should_compress(
+        file_path, stat.st_size, codec, options['compression_skip_extensions'], options['compression_min_size'])
+
+    def verify_destination(dest_file):
+        result['dest_digest'], result['readback_seconds'] = readback(dest_file, options, verify_hasher,
+                                                                     codec if compress else None)
+
+    if compress:
+        dest_file = task['dest'] + CODECS[codec][0]
+        chunk_size = limiter.chunk_size(options['copy_chunk_size']) if limiter is not None else options['copy_chunk_size']
+        result['stored_bytes'] = compress_file(file_path, dest_file, codec, options['compression_level'], chunk_size,
+                                               hashers, progress, limiter.consume if limiter is not None else None)
+        result['method'] = codec
+        verify_destination(dest_file)
+        if options['delete_source'] and os.stat(dest_file).st_size != result['stored_bytes']:
+            raise IOError(f"Size mismatch after compressing: {dest_file}")
+    else:
+        result['method'] = transfer_file(file_path, task['dest'], options, stat, hashers, verify_destination, limiter, progress)
+        result['stored_bytes'] = stat.st_size
+
+    return finish_result(result, stat, content_hash, hash_seconds, verify_hasher, manifest_hasher, hashers, started)
+
+
+async def process_file_async(task, options, offload, limiter=None, progress=None, dirs=None):
+    """process_file for the asyncio engine, with blocking calls run through offload(func, *args).
+
+    A plain copy is split into separate calls (the manifest check, the folder,
+    each open, chunk and close, the readback), so it holds an I/O thread only
+    while one of them runs. Moves and compressed files still run process_file
+    as one call. Takes and returns the same as process_file.
+    """
+    file_path, stat = task['path'], task['stat']
+    if stat is None or options['operation'] != "copy" or should_compress(
+            file_path, stat.st_size, options['compression'], options['compression_skip_extensions'],
+            options['compression_min_size']):
+        return await offload(process_file, task, options, limiter, progress, dirs)
+
+    started = time.perf_counter()
+    if task['previous'] is not None:
+        skipped, content_hash, hash_seconds = await offload(check_unchanged, file_path, stat, task['previous'], options)
+        if skipped is not None:
+            return skipped
+    else:
+        content_hash, hash_seconds = None, 0.0
+    verify_hasher, manifest_hasher, hashers = transfer_hashers(options, content_hash)
+
+    result = {'outcome': "transferred", 'bytes': stat.st_size, 'digest': None, 'dest_digest': None,
+              'stored_bytes': stat.st_size}
+    folder = os.path.dirname(task['dest'])
+    if dirs is None:
+        result['mkdir_seconds'] = await offload(timed_call, os.makedirs, folder, 0o777, True)
+    elif not dirs.is_known(folder):
+        result['mkdir_seconds'] = await offload(timed_call, dirs.ensure, folder)
+    else:
+        result['mkdir_seconds'] = 0.0
+
+    chunk_size = options['copy_chunk_size']
+    if limiter is not None:
+        chunk_size = limiter.chunk_size(chunk_size)
+
+    def on_chunk(amount):
+        if progress is not None:
+            progress(amount)
+        if limiter is not None:
+            limiter.consume(amount)
+
+    throttle = on_chunk if (limiter is not None or progress is not None) else None
+    result['method'] = await copy_file_async(offload, file_path, task['dest'], stat, chunk_size, hashers, throttle)
+    if verify_hasher is not None and options['verify_readback']:
+        result['dest_digest'], result['readback_seconds'] = await offload(readback, task['dest'], options, verify_hasher)
+    if options['delete_source']:
+        # Cross-device move: the source is deleted later, so make sure the copy is complete first
+        copied = await offload(os.stat, task['dest'])
+        if copied.st_size != stat.st_size:
+            raise IOError(f"Size mismatch after copy: {task['dest']} has {copied.st_size} bytes")
+
+    return finish_result(result, stat, content_hash, hash_seconds, verify_hasher, manifest_hasher, hashers, started)
+
+
+def check_unchanged(file_path, stat, previous, options):
+    """(skipped result, content_hash, hash_seconds) for a file against its manifest entry; the result is None
+    when the file has to be transferred, and content_hash is set when its contents were hashed to find out"""
+    if previous is None:
+        return None, None, 0.0
+    prev_size, prev_mtime_ns, prev_hash = previous
+    if stat.st_size == prev_size and stat.st_mtime_ns == prev_mtime_ns:
+        return ({'outcome': "skipped", 'entry': (stat.st_size, stat.st_mtime_ns, prev_hash), 'method': None,
+                 'bytes': 0, 'hash_seconds': 0.0}, None, 0.0)
+    # Touched but possibly not modified: compare contents before re-sending
+    if options['incremental_hash'] and prev_hash and stat.st_size == prev_size:
+        content_hash, hash_seconds = hash_file(file_path, MANIFEST_ALGORITHM)
+        if content_hash == prev_hash:
+            return ({'outcome': "skipped", 'entry': (stat.st_size, stat.st_mtime_ns, content_hash), 'method': None,
+                     'bytes': 0, 'hash_seconds': hash_seconds}, content_hash, hash_seconds)
+        return None, content_hash, hash_seconds
+    return None, None, 0.0
+
+
+def transfer_hashers(options, content_hash=None):
+    """(verify hasher, manifest hasher, hashers to feed the copy) for a transfer; either hasher may be None"""
+    # Hash while the data streams through the copy rather than reading the file again
+    verify_hasher = TimedHasher(options['verify_algorithm']) if options['verify'] else None
+    manifest_hasher = None
+    if options['incremental_hash'] and content_hash is None:
+        if verify_hasher is not None and options['verify_algorithm'] == MANIFEST_ALGORITHM:
+            manifest_hasher = verify_hasher
+        else:
+            manifest_hasher = TimedHasher(MANIFEST_ALGORITHM)
+    hashers = [verify_hasher] if verify_hasher is not None else []
+    if manifest_hasher is not None and manifest_hasher is not verify_hasher:
+        hashers.append(manifest_hasher)
+    return verify_hasher, manifest_hasher, hashers
+
+
+def readback(dest_file, options, verify_hasher, codec=None):
+    """(dest digest, seconds) from reading dest_file back for verify_readback, (None, 0.0) when it is off.
+    Raises IOError when the digest differs from what was copied."""
+    if verify_hasher is None or not options['verify_readback']:
+        return None, 0.0
+    if codec:
+        dest_digest, seconds = hash_compressed(dest_file, codec, options['verify_algorithm'])
+    else:
+        dest_digest, seconds = hash_file(dest_file, options['verify_algorithm'])
+    if dest_digest != verify_hasher.hexdigest():
+        raise IOError(f"Checksum mismatch after copy: {dest_file}")
+    return dest_digest, seconds
+
+
+def finish_result(result, stat, content_hash, hash_seconds, verify_hasher, manifest_hasher, hashers, started):
+    """Add the digests, hashing time, manifest entry and duration to a transfer's result"""
+    if manifest_hasher is not None:
+        content_hash = manifest_hasher.hexdigest()
+    if verify_hasher is not None and result['method'] != "rename":
+        result['digest'] = verify_hasher.hexdigest()
+    result['hash_seconds'] = hash_seconds + sum(h.seconds for h in hashers) + result.pop('readback_seconds', 0.0)
+    result['entry'] = (stat.st_size, stat.st_mtime_ns, content_hash)
+    result['duration'] = time.perf_counter() - started
+    return result
+
+
+def transfer_file(file_path, dest_file, options, stat=None, hashers=None, verify=None, limiter=None, progress=None):
+    """Copy or move a single file into an existing destination folder. Returns the copy method used."""
+    stat = stat or os.stat(file_path)
+    chunk_size = options['copy_chunk_size']
+    if limiter is not None:
+        chunk_size = limiter.chunk_size(chunk_size)
+    streamed = [0]
+
+    def on_chunk(amount):
+        streamed[0] += amount
+        if progress is not None:
+            progress(amount)
+        if limiter is not None:
+            limiter.consume(amount)
+
+    throttle = on_chunk if (limiter is not None or progress is not None) else None
+    if options['operation'] == "copy":
+        method = copy_file(file_path, dest_file, stat, chunk_size, options['copy_backend'], hashers, throttle)
+        if verify is not None:
+            verify(dest_file)
+        if options['delete_source']:
+            # Cross-device move: the source is deleted later, so make sure the copy is complete first
+            copied_size = os.stat(dest_file).st_size
+            if copied_size != stat.st_size:
+                raise IOError(f"Size mismatch after copy: {dest_file} has {copied_size} bytes")
+    else:
+        method = move_file(file_path, dest_file, stat, chunk_size, options['copy_backend'], hashers, verify, throttle)
+    # Reflinks and renames move no chunks; account for their bytes in one go
+    if progress is not None and streamed[0] < stat.st_size:
+        progress(stat.st_size - streamed[0])
+    return method
+
+
+def timed_call(func, *args):
+    """Call func and return how long it took (measured on the thread that runs it, so queueing is not counted)"""
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+# Per-process state of the process engine, set up once per worker process by init_worker_process
+_worker = {}
+
+
+def init_worker_process(options, bandwidth, shared_bucket, final_destination):
+    """Initializer for process engine workers: the locks in a limiter or folder cache cannot be pickled, so build them here.
+    shared_bucket is the global bandwidth budget all the workers share."""
+    _worker['options'] = options
+    _worker['limiter'] = BandwidthLimiter(bandwidth, shared_bucket) if bandwidth else None
+    _worker['dirs'] = DirectoryCache(final_destination)
+    _worker['folders_reported'] = 0
+
+
+def process_task(task):
+    """Process engine counterpart of the thread engine's per-task function. The result also carries
+    'folders_created', the folders this worker created since its last result, for the parent to add up."""
+    dirs = _worker['dirs']
+    if 'members' in task:
+        result = bundle_files(task, _worker['options'], None, _worker['limiter'])
+    else:
+        result = process_file(task, _worker['options'], _worker['limiter'], None, dirs)
+    result['folders_created'] = dirs.created - _worker['folders_reported']
+    _worker['folders_reported'] = dirs.created
+    return result
+
+
+def precount(source, tracker):
+    """Walk the tree once for totals only and hand them to the progress tracker"""
+    files = size = 0
+    for _, _, stat in scan_files(source):
+        files += 1
+        size += stat.st_size if stat else 0
+    tracker.set_total(files, size)
 
 
 def run_once(self):
@@ -0,0 +1,46 @@
+import os
+import re
+import fnmatch
+
+# Windows file names are case-insensitive
+_FLAGS = re.IGNORECASE if os.name == "nt" else 0
+
+
+def compile_patterns(patterns):
+    """(path regex, name regex) for a list of glob patterns; each is None when no pattern of its kind is given"""
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    patterns = [pattern.replace("\\", "/") for pattern in patterns or [] if pattern]
+
+    def combine(group):
+        return re.compile("|".join(fnmatch.translate(pattern) for pattern in group), _FLAGS) if group else None
+
+    return combine([p for p in patterns if "/" in p]), combine([p for p in patterns if "/" not in p])
+
+
+def path_filter(include=None, exclude=None):
+    """A predicate telling whether a file passes the include and exclude patterns; None when there are none.
+
+    Patterns are shell-style globs. A pattern containing a slash is matched
+    against the path relative to the source, any other against the file name
+    alone, so "*.tmp" matches in every folder and "reports/*.csv" only below
+    reports. A file passes when it matches an include pattern (or there are
+    none) and no exclude pattern.
+    """
+    included = compile_patterns(include)
+    excluded = compile_patterns(exclude)
+    if not any(included) and not any(excluded):
+        return None
+
+    def matches(regexes, rel_path, name):
+        by_path, by_name = regexes
+        return bool((by_path and by_path.match(rel_path)) or (by_name and by_name.match(name)))
+
+    def passes(rel_path):
+        rel_path = rel_path.replace(os.sep, "/")
+        name = rel_path.rsplit("/", 1)[-1]
+        if any(included) and not matches(included, rel_path, name):
+            return False
+        return not matches(excluded, rel_path, name)
+
+    return passes
@@ -0,0 +1,58 @@
+import hashlib
+import time
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None  # Optional: pip install xxhash for the fast non-cryptographic hashes
+
+DEFAULT_ALGORITHM = "sha256"
+
+_XXHASH_ALGORITHMS = ("xxh32", "xxh64", "xxh3_64", "xxh3_128", "xxh128")
+
+
+def available_algorithms():
+    """Names accepted by new_hasher on this installation"""
+    names = set(hashlib.algorithms_available)
+    if xxhash is not None:
+        names.update(name for name in _XXHASH_ALGORITHMS if hasattr(xxhash, name))
+    return sorted(names)
+
+
+def new_hasher(algorithm=DEFAULT_ALGORITHM):
+    """Create a hash object for the given algorithm (hashlib names, or xxhash ones if installed)"""
+    algorithm = (algorithm or DEFAULT_ALGORITHM).lower()
+    if algorithm in _XXHASH_ALGORITHMS:
+        if xxhash is None:
+            raise ValueError(f"Hash algorithm '{algorithm}' needs the xxhash package")
+        return getattr(xxhash, algorithm)()
+    try:
+        return hashlib.new(algorithm)
+    except ValueError:
+        raise ValueError(f"Unsupported hash algorithm '{algorithm}'. Available: {', '.join(available_algorithms())}")
+
+
+class TimedHasher:
+    """Wraps a hash object and records how long update() takes, to measure verify overhead"""
+
+    def __init__(self, algorithm=DEFAULT_ALGORITHM):
+        self.algorithm = algorithm
+        self.hasher = new_hasher(algorithm)
+        self.seconds = 0.0
+
+    def update(self, data):
+        started = time.perf_counter()
+        self.hasher.update(data)
+        self.seconds += time.perf_counter() - started
+
+    def hexdigest(self):
+        return self.hasher.hexdigest()
+
+
+def hash_file(file_path, algorithm=DEFAULT_ALGORITHM, chunk_size=1024 * 1024):
+    """Return (hex digest, seconds spent hashing) for a file's contents"""
+    hasher = TimedHasher(algorithm)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest(), hasher.seconds
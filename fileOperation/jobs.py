@@ -0,0 +1,149 @@
+import os
+import copy
+import time
+import types
+import threading
+from fileOperation.engine import create_executor
+from fileOperation.fileOperations import perform_file_operation
+from utils.utils import get_date_folder_name
+
+# Settings of the runner itself; every other top-level setting is a default for the jobs
+RUNNER_KEYS = ("jobs", "max_concurrent_jobs", "max_jobs_per_destination")
+
+
+def load_jobs(config, names=None):
+    """The configured jobs, each as a complete config: the job's own settings over the top-level ones.
+
+    names selects and orders the jobs to run; all of them by default. Raises
+    ValueError for a job without a name, a duplicate name or an unknown name.
+    """
+    jobs = config.get('jobs') or []
+    if not isinstance(jobs, list):
+        raise ValueError("'jobs' must be a list of job settings")
+    defaults = {key: value for key, value in config.items() if key not in RUNNER_KEYS}
+    loaded = {}
+    for number, job in enumerate(jobs, 1):
+        if not isinstance(job, dict) or not job.get('name'):
+            raise ValueError(f"Job {number} in the config has no 'name'")
+        if job['name'] in loaded:
+            raise ValueError(f"Job name '{job['name']}' is used twice")
+        loaded[job['name']] = dict(defaults, **job)
+    if not names:
+        return list(loaded.values())
+    unknown = [name for name in names if name not in loaded]
+    if unknown:
+        raise ValueError(f"Unknown job '{unknown[0]}'. Configured jobs: {', '.join(loaded) or 'none'}")
+    return [loaded[name] for name in dict.fromkeys(names)]
+
+
+def destination_key(job):
+    """Jobs with the same key count against the same max_jobs_per_destination limit"""
+    return job.get('destination_group') or os.path.normcase(os.path.abspath(job.get('destination_path', '')))
+
+
+def job_app(self, job):
+    """A batch-mode view of the app that runs one job: its own config, the app's database and notifiers"""
+    view = copy.copy(self)
+    view.gui_mode = False
+    view.config = job
+    view.get_date_folder_name = types.MethodType(get_date_folder_name, view)
+    view.perform_file_operation = types.MethodType(perform_file_operation, view)
+    return view
+
+
+class JobRunner:
+    """Runs jobs on their own threads within the concurrency limits, sharing one pool of transfer threads.
+
+    Up to max_concurrent_jobs run at the same time, at most
+    max_jobs_per_destination of them against one destination. A job held back
+    by its destination's limit lets later jobs for other destinations go first.
+    Jobs on the threads engine share a pool of the top-level workers setting;
+    a job's own workers setting caps how many of its files are in flight. All
+    jobs log through the one database writer and email through shared notifiers.
+    The pool stays up between jobs until close().
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.max_jobs = max(1, int(app.config.get('max_concurrent_jobs', 2)))
+        self.per_destination = max(1, int(app.config.get('max_jobs_per_destination', 1)))
+        self.workers = max(1, int(app.config.get('workers', 4)))
+        self.pool = create_executor(self.workers)
+        self.pending = []
+        self.running = {}  # destination key -> jobs running against it
+        self.threads = set()
+        self.changed = threading.Condition()
+
+    def submit(self, job, on_done=None, files=None):
+        """Start job as soon as the limits allow; on_done(name, succeeded) is called on its thread when it ends.
+        files limits the run to those entries (see perform_file_operation)."""
+        with self.changed:
+            self.pending.append((job, on_done, files))
+            self._start_ready()
+
+    def wait(self):
+        """Wait until every submitted job has finished"""
+        with self.changed:
+            while self.pending or self.threads:
+                self.changed.wait()
+
+    def close(self):
+        """Let the submitted jobs finish, then shut the pool down"""
+        self.wait()
+        self.pool.shutdown()
+
+    def _start_ready(self):
+        for entry in list(self.pending):
+            job = entry[0]
+            if len(self.threads) >= self.max_jobs:
+                return
+            key = destination_key(job)
+            if self.running.get(key, 0) >= self.per_destination:
+                continue
+            self.pending.remove(entry)
+            self.running[key] = self.running.get(key, 0) + 1
+            thread = threading.Thread(target=self._run, args=entry, name=f"job-{job['name']}")
+            self.threads.add(thread)
+            thread.start()
+
+    def _run(self, job, on_done, files):
+        name = job['name']
+        started = time.perf_counter()
+        succeeded = False
+        print(f"[BATCH] Job '{name}' started: {job.get('operation_type', 'copy')} "
+              f"{job.get('source_path', '')} -> {job.get('destination_path', '')}"
+              + (f" ({len(files)} files)" if files is not None else ""))
+        try:
+            succeeded = job_app(self.app, job).perform_file_operation(executor=self.pool, files=files)
+        except Exception as e:
+            print(f"[BATCH] Job '{name}' failed: {str(e)}")
+        finally:
+            print(f"[BATCH] Job '{name}' {'succeeded' if succeeded else 'failed'} "
+                  f"after {time.perf_counter() - started:.2f} seconds")
+            try:
+                if on_done is not None:
+                    on_done(name, succeeded)
+            finally:
+                self.app.db.close_reader()  # This thread ends here
+                with self.changed:
+                    self.running[destination_key(job)] -= 1
+                    self.threads.discard(threading.current_thread())
+                    self._start_ready()
+                    self.changed.notify_all()
+
+
+def run_jobs(self, jobs):
+    """Run jobs (from load_jobs) once each, within the JobRunner limits; returns {name: succeeded}"""
+    runner = JobRunner(self)
+    print(f"[BATCH] Running {len(jobs)} jobs, {runner.max_jobs} at a time and {runner.per_destination} per destination, "
+          f"on {runner.workers} shared workers")
+    results = {}
+    for job in jobs:
+        runner.submit(job, results.__setitem__)
+    runner.close()
+
+    results = {job['name']: results[job['name']] for job in jobs}  # In the configured order
+    succeeded = sum(1 for ok in results.values() if ok)
+    print(f"[BATCH] {succeeded} of {len(jobs)} jobs succeeded"
+          + ("" if succeeded == len(jobs) else ": failed " + ", ".join(name for name, ok in results.items() if not ok)))
+    return results
@@ -0,0 +1,105 @@
+import os
+
+
+def same_device(source, destination):
+    """True when a rename from source to destination can work (same filesystem/volume)"""
+    try:
+        return os.stat(source).st_dev == os.stat(destination).st_dev
+    except OSError:
+        return False
+
+
+def count_files(path):
+    """Count the files below path using directory listings only (no per-file stat on most platforms)"""
+    if not os.path.isdir(path) or os.path.islink(path):
+        return 1
+    count = 0
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    count += 1
+    return count
+
+
+def rename_tree(source, destination, rel_dir=""):
+    """Move the contents of source into destination by renaming whole subtrees.
+
+    Every entry that does not exist in the destination yet is renamed in one
+    step, however many files it holds; only directories that already exist on
+    both sides are descended into and merged. Yields (rel_path, files, error)
+    for each rename, where files is the number of files the rename moved.
+    Source directories emptied by a merge are removed, the source root is kept.
+    """
+    destination_real = os.path.realpath(destination)
+    with os.scandir(source) as scanned:
+        entries = list(scanned)
+
+    for entry in entries:
+        rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+        target = os.path.join(destination, entry.name)
+
+        # Never move the destination (or a folder containing it) into itself
+        entry_real = os.path.realpath(entry.path)
+        if destination_real == entry_real or destination_real.startswith(entry_real + os.sep):
+            continue
+
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if is_dir and os.path.isdir(target) and not os.path.islink(target):
+                yield from rename_tree(entry.path, target, rel_path)
+                try:
+                    os.rmdir(entry.path)
+                except OSError:
+                    pass  # Something could not be moved; leave the folder in place
+                continue
+
+            if os.path.lexists(target):
+                if is_dir:
+                    raise IsADirectoryError(f"Cannot replace {target} with a directory")
+                os.replace(entry.path, target)
+                yield rel_path, 1, None
+                continue
+
+            files = count_files(entry.path)
+            os.rename(entry.path, target)
+            yield rel_path, files, None
+        except OSError as e:
+            yield rel_path, 0, e
+
+
+def delete_sources(files):
+    """Delete source files that have been copied and verified; returns (errors, changed).
+
+    files holds (path, size, mtime_ns) as each file was when it was copied. A
+    file whose size or modification time differs now was written to after the
+    copy, so it is left in place and its path listed in changed.
+    """
+    errors = []
+    changed = []
+    for path, size, mtime_ns in files:
+        try:
+            stat = os.stat(path)
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                changed.append(path)
+                continue
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            errors.append(e)
+    return errors, changed
+
+
+def remove_empty_dirs(root):
+    """Remove directories left empty below root (root itself is kept)"""
+    for directory, _, _ in os.walk(root, topdown=False):
+        if os.path.normcase(os.path.abspath(directory)) == os.path.normcase(os.path.abspath(root)):
+            continue
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass  # Not empty
@@ -0,0 +1,137 @@
+import time
+import threading
+
+GUI_UPDATE_SECONDS = 0.25
+
+
+def format_bytes(size):
+    """Human readable byte count, e.g. 12.3 MB"""
+    size = float(size or 0)
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_duration(seconds):
+    """Short duration for ETAs, e.g. 2m 05s"""
+    if seconds is None:
+        return "unknown"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class ProgressTracker:
+    """Counts discovered and finished work and derives rates and an ETA.
+
+    Totals grow while the walk is still running, so until walk_finished() (or
+    set_total() from a pre-count) the percentage and ETA are estimates.
+    Bytes are added per copied chunk, so rates stay live during large files.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.files_found = 0
+        self.bytes_found = 0
+        self.files_done = 0
+        self.bytes_done = 0
+        self.walk_done = False
+        self.precounted = None  # (files, bytes) from a separate pre-count walk
+
+    def discovered(self, size):
+        with self.lock:
+            self.files_found += 1
+            self.bytes_found += size or 0
+
+    def set_total(self, files, size):
+        with self.lock:
+            self.precounted = (files, size)
+
+    def walk_finished(self):
+        with self.lock:
+            self.walk_done = True
+
+    def add_bytes(self, amount):
+        with self.lock:
+            self.bytes_done += amount
+
+    def skipped(self, size):
+        """An unchanged file needs no transfer, so take it out of the remaining work"""
+        with self.lock:
+            self.files_found -= 1
+            self.bytes_found -= size or 0
+            if self.precounted is not None:
+                self.precounted = (self.precounted[0] - 1, self.precounted[1] - (size or 0))
+
+    def file_done(self):
+        with self.lock:
+            self.files_done += 1
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = max(time.monotonic() - self.started, 1e-6)
+            bytes_per_sec = self.bytes_done / elapsed
+            files_per_sec = self.files_done / elapsed
+            if self.walk_done or self.precounted is None:
+                files_total, bytes_total = self.files_found, self.bytes_found
+            else:
+                files_total, bytes_total = self.precounted
+            if bytes_total:
+                fraction = min(1.0, self.bytes_done / bytes_total)
+            else:
+                fraction = min(1.0, self.files_done / files_total) if files_total else 0.0
+            remaining = max(0, bytes_total - self.bytes_done)
+            eta = remaining / bytes_per_sec if bytes_per_sec > 0 else None
+            return {
+                'elapsed': elapsed,
+                'files_done': self.files_done,
+                'files_found': files_total,
+                'bytes_done': self.bytes_done,
+                'bytes_found': bytes_total,
+                'bytes_per_sec': bytes_per_sec,
+                'files_per_sec': files_per_sec,
+                'percent': fraction * 100,
+                'eta': eta,
+                'estimate': not (self.walk_done or self.precounted is not None),
+            }
+
+
+def describe(snapshot):
+    """One-line progress summary shared by the batch output and the GUI status bar"""
+    approx = "~" if snapshot['estimate'] else ""
+    return (f"{snapshot['files_done']}/{approx}{snapshot['files_found']} files, "
+            f"{format_bytes(snapshot['bytes_done'])}/{approx}{format_bytes(snapshot['bytes_found'])} "
+            f"({approx}{snapshot['percent']:.0f}%), {format_bytes(snapshot['bytes_per_sec'])}/s, "
+            f"{snapshot['files_per_sec']:.1f} files/s, ETA {approx}{format_duration(snapshot['eta'])}")
+
+
+class ProgressReporter:
+    """Pushes tracker snapshots to the Tk progress bar or prints them in batch mode, rate limited"""
+
+    def __init__(self, app, tracker, execution_mode, interval=5.0):
+        self.app = app
+        self.tracker = tracker
+        self.execution_mode = execution_mode
+        self.interval = GUI_UPDATE_SECONDS if app.gui_mode else float(interval)
+        self.last_report = 0.0
+
+    def report(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        snapshot = self.tracker.snapshot()
+        if self.app.gui_mode:
+            self.app.root.after(0, lambda: self._update_gui(snapshot))
+        else:
+            print(f"[{self.execution_mode}] Progress: {describe(snapshot)}")
+
+    def _update_gui(self, snapshot):
+        if self.app.progress_bar is not None:
+            self.app.progress_bar['value'] = snapshot['percent']
+        self.app.status_var.set(f"Running: {describe(snapshot)}")
@@ -0,0 +1,146 @@
+import time
+import threading
+import multiprocessing
+from datetime import datetime
+
+# How often the time-of-day profile is re-evaluated during a run
+PROFILE_CHECK_SECONDS = 30
+MIN_THROTTLED_CHUNK = 64 * 1024
+
+
+class TokenBucket:
+    """Thread-safe token bucket; rate is in bytes/sec and 0 means unlimited.
+
+    consume() takes the tokens straight away (the bucket may go into debt for a
+    chunk larger than the burst) and sleeps outside the lock until the debt
+    would be paid back, so concurrent workers share the rate fairly and the
+    cost per call is a lock and a little arithmetic.
+    """
+
+    def __init__(self, rate=0, burst_seconds=1.0):
+        self.lock = threading.Lock()
+        self.burst_seconds = burst_seconds
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = max(0, int(rate or 0))
+            self.capacity = self.rate * self.burst_seconds
+            self.tokens = self.capacity
+            self.updated = time.monotonic()
+
+    def consume(self, amount):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _shared_field(index):
+    """An attribute of a SharedTokenBucket stored in its shared array"""
+    return property(lambda self: self.state[index], lambda self, value: self.state.__setitem__(index, value))
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket kept in shared memory, so worker processes draw on one budget.
+
+    Create it in the parent and hand it to the workers as they start (e.g.
+    as an initializer argument). Whichever process is transferring can use
+    the whole rate; several share it as threads share a TokenBucket.
+    """
+
+    def __init__(self, rate=0, burst_seconds=1.0):
+        # rate, capacity, tokens, updated; the array's lock is shared with it and is reentrant
+        self.state = multiprocessing.Array('d', 4)
+        self.lock = self.state.get_lock()
+        self.burst_seconds = burst_seconds
+        TokenBucket.set_rate(self, rate)
+
+    rate = _shared_field(0)
+    capacity = _shared_field(1)
+    tokens = _shared_field(2)
+    updated = _shared_field(3)
+
+    def set_rate(self, rate):
+        with self.lock:
+            # Every worker notices a profile change; only the first one resets the budget
+            if max(0, int(rate or 0)) != self.rate:
+                TokenBucket.set_rate(self, rate)
+
+
+def _minutes(hhmm):
+    hours, minutes = str(hhmm).split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def active_limits(settings, now=None):
+    """Return (global, per_worker) bytes/sec for the current time of day.
+
+    The first profile whose start-end window contains now wins (a window may
+    wrap past midnight); otherwise the top-level limits apply.
+    """
+    now = now or datetime.now()
+    current = now.hour * 60 + now.minute
+    for profile in settings.get('profiles', []):
+        start, end = _minutes(profile['start']), _minutes(profile['end'])
+        inside = start <= current < end if start <= end else (current >= start or current < end)
+        if inside:
+            return (profile.get('global_bytes_per_sec', 0), profile.get('per_worker_bytes_per_sec', 0))
+    return (settings.get('global_bytes_per_sec', 0), settings.get('per_worker_bytes_per_sec', 0))
+
+
+class BandwidthLimiter:
+    """Global and per-worker bandwidth limits for the copy path, following the configured profiles.
+    global_bucket replaces the limiter's own bucket for the global limit, e.g. a SharedTokenBucket."""
+
+    def __init__(self, settings, global_bucket=None):
+        self.settings = settings or {}
+        self.global_bucket = global_bucket if global_bucket is not None else TokenBucket()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.next_check = 0
+        self.limits = (0, 0)
+        self.generation = 0
+        self._refresh()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now < self.next_check:
+            return
+        with self.lock:
+            if now < self.next_check:
+                return
+            self.next_check = now + PROFILE_CHECK_SECONDS
+            limits = active_limits(self.settings)
+            if limits != self.limits:
+                self.limits = limits
+                self.global_bucket.set_rate(limits[0])
+                self.generation += 1
+
+    @property
+    def enabled(self):
+        return bool(self.settings.get('global_bytes_per_sec') or self.settings.get('per_worker_bytes_per_sec')
+                    or self.settings.get('profiles'))
+
+    def chunk_size(self, chunk_size):
+        """Shrink copy chunks when throttled so the rate stays smooth instead of bursty"""
+        rates = [rate for rate in self.limits if rate]
+        if not rates:
+            return chunk_size
+        return max(MIN_THROTTLED_CHUNK, min(chunk_size, min(rates) // 8))
+
+    def consume(self, amount):
+        self._refresh()
+        bucket = getattr(self.local, 'bucket', None)
+        if bucket is None or self.local.generation != self.generation:
+            bucket = self.local.bucket = TokenBucket(self.limits[1])
+            self.local.generation = self.generation
+        bucket.consume(amount)
+        self.global_bucket.consume(amount)
+
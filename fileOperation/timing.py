@@ -0,0 +1,156 @@
+import os
+import sys
+import math
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+
+# From Python 3.12 cProfile runs on sys.monitoring: one profiler sees every thread, and only one may be active
+PROFILER_SEES_ALL_THREADS = sys.version_info >= (3, 12)
+
+# Phases whose time is summed over parallel threads (so they can add up to more than the run took)
+WORKER_PHASES = ("walk", "mkdir", "copy", "hash")
+
+
+class PhaseTimer:
+    """Accumulates the seconds a run spends in each phase (walk, mkdir, copy, db, email, ...).
+
+    Wall-clock phases are timed on the run thread with phase(); per-file phases
+    are added from the workers with add(), so they are totals across threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.seconds = {}
+        self.calls = {}
+
+    def add(self, name, seconds, calls=1):
+        with self.lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + calls
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def wrap(self, name, func):
+        """Return func timed under name, e.g. for the flush function of a BatchWriter"""
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return timed
+
+    def rows(self):
+        """(phase, seconds, calls, kind) rows for the run_phases table, including the run total"""
+        with self.lock:
+            rows = [(name, seconds, self.calls[name], "worker" if name in WORKER_PHASES else "wall")
+                    for name, seconds in sorted(self.seconds.items())]
+        rows.append(("total", time.perf_counter() - self.started, 1, "wall"))
+        return rows
+
+    def summary(self):
+        return ", ".join(f"{name} {seconds:.2f}s" for name, seconds, _, _ in self.rows())
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def latency_histogram(latencies):
+    """Text histogram of per-file latencies in power-of-two millisecond buckets, with p50/p95/p99"""
+    values = sorted(latencies)
+    if not values:
+        return "No files were transferred\n"
+    lines = [f"files: {len(values)}"]
+    for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+        lines.append(f"{name}: {percentile(values, fraction) * 1000:.2f} ms")
+    lines.append(f"max: {values[-1] * 1000:.2f} ms")
+    lines.append("")
+
+    buckets = {}
+    for seconds in values:
+        upper = 1
+        while seconds * 1000 > upper:
+            upper *= 2
+        buckets[upper] = buckets.get(upper, 0) + 1
+    widest = max(buckets.values())
+    for upper in sorted(buckets):
+        label = f"<= {upper} ms"
+        bar = "#" * max(1, buckets[upper] * 50 // widest)
+        lines.append(f"{label:>12} {buckets[upper]:>8} {bar}")
+    return "\n".join(lines) + "\n"
+
+
+class RunProfiler:
+    """cProfile for the run thread and every worker thread, plus per-file latencies, written per run.
+
+    Before Python 3.12 cProfile only sees the thread it was enabled on, so each
+    worker gets its own profiler (via wrap()) and all of them are merged into
+    one pstats dump. From 3.12 the run's profiler already sees the workers and
+    a second one cannot be enabled, so wrap() leaves the function alone. For
+    the same reason only one run at a time can be profiled there; start()
+    returns False for the others.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.main = cProfile.Profile()
+        self.workers = []
+        self.latencies = []
+
+    def start(self):
+        """Enable profiling; False if another profiler is already active"""
+        try:
+            self.main.enable()
+        except ValueError:
+            return False
+        return True
+
+    def stop(self):
+        self.main.disable()
+
+    def wrap(self, func):
+        """Return func profiled on whichever worker thread runs it"""
+        if PROFILER_SEES_ALL_THREADS:
+            return func
+
+        def profiled(*args, **kwargs):
+            profiler = getattr(self.local, 'profiler', None)
+            if profiler is None:
+                profiler = self.local.profiler = cProfile.Profile()
+                with self.lock:
+                    self.workers.append(profiler)
+            profiler.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.disable()
+        return profiled
+
+    def record_latency(self, seconds):
+        self.latencies.append(seconds)
+
+    def write(self, run_id):
+        """Write <run_id>.pstats and <run_id>-latency.txt to the profile directory; returns their paths"""
+        os.makedirs(self.directory, exist_ok=True)
+        stats_path = os.path.join(self.directory, f"{run_id}.pstats")
+        latency_path = os.path.join(self.directory, f"{run_id}-latency.txt")
+        stats = pstats.Stats(self.main)
+        for profiler in self.workers:
+            stats.add(profiler)
+        stats.dump_stats(stats_path)
+        with open(latency_path, 'w') as f:
+            f.write(latency_histogram(self.latencies))
+        return stats_path, latency_path
@@ -0,0 +1,97 @@
+import os
+import time
+import queue
+import threading
+
+_DONE = object()
+
+
+def scan_files(source, onerror=None):
+    """Yield (path, rel_path, stat) for every file below source.
+
+    Uses os.scandir so the stat result cached on each DirEntry is reused instead
+    of stat'ing the file again. Like os.walk, symlinked directories are not
+    followed. Directories that cannot be listed are passed to onerror and skipped.
+    """
+    stack = [(source, "")]
+    while stack:
+        directory, rel_dir = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError as e:
+            if onerror is not None:
+                onerror(e)
+            continue
+
+        subdirs = []
+        with entries:
+            for entry in entries:
+                rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():
+                        subdirs.append((entry.path, rel_path))
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    stat = None  # e.g. a dangling symlink; the copy stage reports the error
+                yield entry.path, rel_path, stat
+
+        # Reverse so directories are visited in listing order, like os.walk
+        stack.extend(reversed(subdirs))
+
+
+def stream_files(source, maxsize=1000, onerror=None, on_finish=None):
+    """Run scan_files on a background thread and yield its results through a bounded queue.
+
+    The walker blocks when the queue is full, so memory stays flat however large
+    the tree is, and the first transfer starts as soon as the first file is found.
+    on_finish(seconds) receives the time spent scanning, not counting the time
+    blocked on a full queue.
+    """
+    results = queue.Queue(maxsize=max(1, int(maxsize)))
+    cancelled = threading.Event()
+
+    def put(item):
+        while not cancelled.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def walk():
+        started = time.perf_counter()
+        blocked = 0.0
+        try:
+            for item in scan_files(source, onerror):
+                put_started = time.perf_counter()
+                if not put(item):
+                    return
+                blocked += time.perf_counter() - put_started
+            put(_DONE)
+        except Exception as e:
+            put(e)
+        finally:
+            if on_finish is not None:
+                on_finish(time.perf_counter() - started - blocked)
+
+    walker = threading.Thread(target=walk, name="walker", daemon=True)
+    walker.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # The consumer may stop early (e.g. after a failed transfer); release the walker
+        cancelled.set()
+        walker.join()
@@ -0,0 +1,336 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+from datetime import datetime, timedelta
+from database.retention import apply_retention
+from fileOperation.walker import scan_files
+from fileOperation.jobs import JobRunner
+
+# inotify event bits, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; the name follows
+
+# Returned by read() when events were lost and the whole tree has to be looked at again
+RESCAN = None
+
+# What read() knows about a reported file: still open for writing, closed after writing (or moved in
+# whole), changed without knowing whether its writer is done, or deleted (or moved away)
+WRITING = "writing"
+CLOSED = "closed"
+CHANGED = "changed"
+GONE = "gone"
+
+WATCH_METHODS = ("auto", "inotify", "polling")
+
+
+class InotifyWatcher:
+    """Reports files below root as they are written, using Linux inotify through ctypes.
+
+    Every folder gets its own watch; folders created later are added as they
+    appear and the files already in them are reported as CHANGED, since their
+    writes may have happened before the watch existed. Other files are
+    reported as WRITING when created or modified, as CLOSED once the
+    writer closes them or they are moved in, and as GONE when deleted or
+    moved away.
+    """
+
+    settle_floor = 0.0
+
+    def __init__(self, root):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.add_watch = libc.inotify_add_watch
+        self.add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+        self.root = root
+        self.folders = {}  # watch descriptor -> folder
+        try:
+            self.watch_tree(root)
+        except BaseException:
+            self.close()
+            raise
+
+    def watch_tree(self, folder):
+        """Watch folder and everything below it; returns the files found in it"""
+        found = []
+        for directory, subdirs, names in os.walk(folder):
+            wd = self.add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                code = ctypes.get_errno()
+                if code == errno.ENOSPC:
+                    raise OSError(code, "Out of inotify watches; raise fs.inotify.max_user_watches or use polling")
+                if directory == self.root:
+                    raise OSError(code, f"Cannot watch {directory}: {os.strerror(code)}")
+                continue  # Removed again already, or not readable
+            self.folders[wd] = directory
+            found.extend(os.path.join(directory, name) for name in names)
+        return found
+
+    def read(self, timeout):
+        """(path, kind) for files written or moved in since the last call, waiting up to timeout seconds for
+        the first. RESCAN in the list means events were lost."""
+        ready, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not ready:
+            return []
+        changed = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT.unpack_from(data, offset)
+                name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0")
+                offset += EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed.append(RESCAN)
+                    continue
+                if mask & IN_IGNORED:
+                    self.folders.pop(wd, None)  # The folder is gone
+                    continue
+                folder = self.folders.get(wd)
+                if folder is None or not name:
+                    continue
+                path = os.path.join(folder, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        # Files can land in a new folder before its watch exists
+                        changed.extend((found, CHANGED) for found in self.watch_tree(path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    changed.append((path, GONE))
+                else:
+                    changed.append((path, CLOSED if mask & (IN_CLOSE_WRITE | IN_MOVED_TO) else WRITING))
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """Reports files below root whose size or modification time changed, by rescanning every interval seconds"""
+
+    def __init__(self, root, interval=5.0):
+        self.root = root
+        self.interval = max(0.1, float(interval))
+        # A file counts as settled only after a scan has seen it unchanged
+        self.settle_floor = self.interval
+        self.known = self.scan()
+        self.next_scan = time.monotonic() + self.interval
+
+    def scan(self):
+        return {path: (stat.st_size, stat.st_mtime_ns) for path, _, stat in scan_files(self.root) if stat is not None}
+
+    def read(self, timeout):
+        wait = self.next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(max(0.0, timeout))
+            return []
+        time.sleep(max(0.0, wait))
+        self.next_scan = time.monotonic() + self.interval
+        current = self.scan()
+        changed = [(path, CHANGED) for path, state in current.items() if self.known.get(path) != state]
+        self.known = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(root, method="auto", poll_seconds=5.0):
+    """An inotify watcher on Linux, a polling one elsewhere or when inotify cannot be used"""
+    if method not in WATCH_METHODS:
+        raise ValueError(f"Unknown watch method '{method}'. Use one of: {', '.join(WATCH_METHODS)}")
+    if method != "polling" and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            if method == "inotify":
+                raise
+            print(f"[BATCH] inotify unavailable for {root} ({str(e)}), polling every {poll_seconds:g}s instead")
+    elif method == "inotify":
+        raise ValueError("inotify is only available on Linux")
+    return PollingWatcher(root, poll_seconds)
+
+
+class Debouncer:
+    """Holds changed files back until they are complete.
+
+    A CLOSED file is ready at once, and a CHANGED one once nothing has
+    happened to it for settle_seconds. A WRITING one is held until it is
+    closed. Some files never see a close after writing (hard links,
+    symlinks, files created without being written), so a WRITING file with
+    no event for open_seconds is looked at instead, and is ready once its
+    size and modification time stay the same for settle_seconds. A GONE
+    file, or one that can no longer be looked at, is dropped.
+    """
+
+    def __init__(self, settle_seconds, open_seconds=60.0):
+        self.settle_seconds = settle_seconds
+        self.open_seconds = open_seconds
+        self.held = {}  # path -> [time.monotonic() when it is due, kind, (size, mtime_ns) when last looked at]
+
+    def touch(self, path, now, kind=CHANGED):
+        if kind == GONE:
+            self.held.pop(path, None)
+        elif kind == WRITING:
+            self.held[path] = [now + self.open_seconds, kind, None]
+        else:
+            self.held[path] = [now if kind == CLOSED else now + self.settle_seconds, kind, None]
+
+    def next_due(self):
+        """Seconds until the earliest held file is due, None when nothing is held"""
+        if not self.held:
+            return None
+        return max(0.0, min(due for due, _, _ in self.held.values()) - time.monotonic())
+
+    def settled(self, now):
+        """The files that are complete, removed from the held set"""
+        ready = []
+        for path, entry in list(self.held.items()):
+            due, kind, seen = entry
+            if due > now:
+                continue
+            if kind == WRITING:
+                # No close came in time: take the file once it stops changing
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    del self.held[path]
+                    continue
+                state = (stat.st_size, stat.st_mtime_ns)
+                if state != seen:
+                    entry[0], entry[2] = now + self.settle_seconds, state
+                    continue
+            del self.held[path]
+            ready.append(path)
+        return ready
+
+
+def watch_job(runner, job, stop_event):
+    """Watch one job's source and transfer what arrives in micro-batches until stop_event is set.
+
+    With inotify a file is taken once its writer closes it (or it is moved
+    in), or once it has stopped changing after watch_open_seconds without a
+    close; with polling, once it has been quiet for watch_settle_seconds.
+    Files still being written are left alone. Settled files collect into a batch
+    that is started as a run of its own once it has watch_batch_files files
+    or its first file has waited watch_batch_seconds. One batch per job is in
+    flight at a time; files settling meanwhile go into the next one. If the
+    watcher loses events, the next run is a full one over the whole source.
+    """
+    name = job['name']
+    source = os.path.abspath(job.get('source_path', ''))
+    poll_seconds = float(job.get('watch_poll_seconds', 5))
+    watcher = create_watcher(source, job.get('watch_method', 'auto'), poll_seconds)
+    debouncer = Debouncer(max(float(job.get('watch_settle_seconds', 2)), watcher.settle_floor),
+                          float(job.get('watch_open_seconds', 60)))
+    batch_files = max(1, int(job.get('watch_batch_files', 1000)))
+    batch_seconds = float(job.get('watch_batch_seconds', 5))
+    print(f"[BATCH] Job '{name}' watching {source} ({type(watcher).__name__.replace('Watcher', '').lower()})")
+
+    batch = {}  # path -> (path, rel_path, stat)
+    batch_started = None
+    # Files that arrived while the watch was down are picked up by a first full run
+    full_run = bool(job.get('watch_initial_run', True))
+    in_flight = threading.Event()
+
+    try:
+        while not stop_event.is_set():
+            now = time.monotonic()
+            if not in_flight.is_set() and (full_run or batch):
+                if full_run:
+                    # The full run covers whatever is batched too
+                    files, batch, batch_started, full_run = None, {}, None, False
+                elif len(batch) >= batch_files or now - batch_started >= batch_seconds:
+                    files = [batch.pop(path) for path in list(batch)[:batch_files]]
+                    batch_started = now if batch else None
+                else:
+                    files = False
+                if files is not False:
+                    in_flight.set()
+                    runner.submit(job, lambda *_: in_flight.clear(), files)
+
+            waits = [1.0]  # Check stop_event at least once a second
+            due = debouncer.next_due()
+            if due is not None:
+                waits.append(due)
+            if batch and not in_flight.is_set():
+                waits.append(max(0.0, batch_started + batch_seconds - now))
+            for event in watcher.read(min(waits)):
+                if event is RESCAN:
+                    print(f"[BATCH] Job '{name}' missed file events, the next run covers the whole source")
+                    full_run = True
+                else:
+                    path, kind = event
+                    debouncer.touch(path, time.monotonic(), kind)
+
+            now = time.monotonic()
+            for path in debouncer.settled(now):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # Gone again, e.g. a temporary file that was renamed
+                if not os.path.isfile(path):
+                    continue
+                if not batch:
+                    batch_started = now
+                batch[path] = (path, os.path.relpath(path, source), stat)
+    finally:
+        watcher.close()
+
+
+def run_watch(self, jobs, stop_event):
+    """Watch the sources of jobs (from load_jobs) until stop_event is set, each on its own thread.
+    Old records are purged once a day, as the scheduler daemon does."""
+    runner = JobRunner(self)
+    print(f"[BATCH] Watch mode started for {len(jobs)} jobs, {runner.max_jobs} at a time on {runner.workers} shared workers")
+    errors = []
+
+    def watch(job):
+        try:
+            watch_job(runner, job, stop_event)
+        except Exception as e:
+            print(f"[BATCH] Job '{job['name']}' cannot be watched: {str(e)}")
+            errors.append(job['name'])
+
+    threads = [threading.Thread(target=watch, args=(job,), name=f"watch-{job['name']}") for job in jobs]
+    for thread in threads:
+        thread.start()
+    # First shortly after start, like the daemon
+    next_retention = datetime.now() + timedelta(minutes=1)
+    try:
+        while any(thread.is_alive() for thread in threads):
+            stop_event.wait(1.0)
+            if not stop_event.is_set() and datetime.now() >= next_retention:
+                apply_retention(self)
+                next_retention = datetime.now() + timedelta(days=1)
+    finally:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+        print("[BATCH] Watch mode stopping, waiting for running batches to finish")
+        runner.close()
+    print("[BATCH] Watch mode stopped")
+    return not errors
@@ -2,6 +2,8 @@ import tkinter as tk
 import os
 import argparse
 import sys
+import signal
+import threading
 from config.config import load_config_dict,on_closing,map_network_drive, unmap_network_drive,load_config
 from database.db import init_database
 from gui.mainWindow import create_widgets, create_file_ops_tab, create_scheduler_tab, create_email_tab, create_logs_tab
@@ -9,10 +11,16 @@ from utils.utils import update_date_widgets, update_preview,get_date_folder_name
 from scheduler.task_scheduler import create_windows_task, delete_windows_task, check_task_status
 import types
 from fileOperation.fileOperations import run_once, perform_file_operation
+from fileOperation.jobs import load_jobs, job_app, run_jobs
+from scheduler.daemon import run_daemon
+from fileOperation.watcher import run_watch
+from fileOperation.bundler import extract_member
+from database.bundles import find_bundled
+from database.retention import apply_retention
+from database.export import DATASETS, FORMATS, export_records
 
 class FileSchedulerApp:
-    def __init__(self, root=None, config_file=None):
-        self.db_path = r"C:\\Users\\Rishabh.Sonkar\\Desktop\\FileCopier\\database\\file_scheduler_log.db"  # Use absolute path for reliability
+    def __init__(self, root=None, config_file=None, db_path=None):
         # define wrapper
         self.on_closing = lambda: on_closing(self)
          # Set script_dir at the very top
@@ -28,13 +36,16 @@ class FileSchedulerApp:
         self.run_once = types.MethodType(run_once, self)
         
         # Initialize databaseload_config
-        init_database(self)
+        init_database(self, db_path)
+        # Email notifiers by settings; shared with the job views of a multi-job run
+        self.notifiers = {}
         
         # Configuration variables
         if self.gui_mode:
             self.root = root
             self.root.title("File Scheduler Application - Windows Task Scheduler Integration")
             self.root.geometry("900x700")
+            self.config = {}  # Replaced by load_config; holds settings that have no widget
 
             self.source_path = tk.StringVar()
             self.destination_path = tk.StringVar()
@@ -113,14 +124,92 @@ def main():
     """Main function to handle both GUI and command-line execution"""
     parser = argparse.ArgumentParser(description='File Scheduler Application')
     parser.add_argument('--batch', action='store_true', help='Run in batch mode (no GUI)')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep running and start the configured jobs on their schedules (no GUI, no Task Scheduler needed)')
     parser.add_argument('--config', help='Configuration file path')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and transfer files in small batches as they arrive in the source (no GUI)')
+    parser.add_argument('--workers', type=int, help='Number of files to transfer in parallel (overrides config)')
+    parser.add_argument('--engine', choices=['threads', 'processes', 'asyncio'],
+                        help='Run transfers on worker threads, worker processes or an asyncio event loop (overrides config)')
+    parser.add_argument('--resume', metavar='RUN_ID', help='Continue an interrupted or failed batch run')
+    parser.add_argument('--job', action='append', metavar='NAME',
+                        help='Run only this job of a multi-job config (repeat for several; default: all jobs)')
+    parser.add_argument('--profile', nargs='?', const='profiles', metavar='DIR',
+                        help='Write a cProfile dump and per-file latency histogram of the batch run to DIR (default: profiles)')
+    parser.add_argument('--find-bundled', metavar='PATTERN', help='List bundled files matching a path pattern (e.g. "reports/*.csv")')
+    parser.add_argument('--extract-bundled', metavar='PATTERN', help='Extract bundled files matching a path pattern')
+    parser.add_argument('--extract-to', metavar='DIR', default='.', help='Folder to extract bundled files into (default: current folder)')
+    parser.add_argument('--export-logs', metavar='PATH', help='Export logs to PATH (.csv, .jsonl.gz or .parquet) and exit')
+    parser.add_argument('--export-table', choices=sorted(DATASETS), default='operations',
+                        help='What to export: run log entries (default) or the per-file transfer ledger')
+    parser.add_argument('--export-format', choices=FORMATS, help='Export format (default: from the file name)')
+    parser.add_argument('--status', help='Export only this status (SUCCESS/ERROR, or a transfer outcome such as failed)')
+    parser.add_argument('--mode', help='Export only this execution mode (GUI or BATCH)')
+    parser.add_argument('--from', dest='date_from', metavar='YYYY-MM-DD', help='Export entries from this date on')
+    parser.add_argument('--to', dest='date_to', metavar='YYYY-MM-DD', help='Export entries up to and including this date')
     
     args = parser.parse_args()
-    
-    if args.batch:
+
+    if args.find_bundled or args.extract_bundled:
+        app = FileSchedulerApp(root=None, config_file=args.config)
+        pattern = args.find_bundled or args.extract_bundled
+        # The newest copy of each file wins
+        entries = {}
+        for entry in find_bundled(app.db.reader(), pattern):
+            entries.setdefault(entry['rel_path'], entry)
+        for entry in entries.values():
+            if args.extract_bundled:
+                print(f"Extracted {extract_member(entry, args.extract_to)}")
+            else:
+                print(f"{entry['rel_path']}  {entry['size']} bytes  in {entry['bundle_path']} at offset {entry['data_offset']} (run {entry['run_id']})")
+        if not entries:
+            print(f"No bundled files match '{pattern}'")
+        app.db.close()
+        sys.exit(0 if entries else 1)
+
+    if args.export_logs:
+        app = FileSchedulerApp(root=None, config_file=args.config)
+        filters = {'status': args.status, 'execution_mode': args.mode, 'date_from': args.date_from, 'date_to': args.date_to}
+        try:
+            count = export_records(app.db.reader(), args.export_logs, args.export_table, filters, args.export_format)
+            print(f"Exported {count} {args.export_table} records to {args.export_logs}")
+        except (ValueError, OSError) as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+        finally:
+            app.db.close()
+        sys.exit(0)
+
+    if (args.daemon or args.watch) and args.resume:
+        print("ERROR: --resume continues a run once; use it with --batch")
+        sys.exit(1)
+    if args.daemon and args.watch:
+        print("ERROR: Use either --daemon or --watch")
+        sys.exit(1)
+
+    if args.batch or args.daemon or args.watch:
         # Command-line/batch execution
-        print("Starting File Scheduler in batch mode...")
+        print(f"Starting File Scheduler in {'daemon' if args.daemon else 'watch' if args.watch else 'batch'} mode...")
         app = FileSchedulerApp(root=None, config_file=args.config)
+        if args.workers:
+            app.config['workers'] = args.workers
+        if args.engine:
+            app.config['engine'] = args.engine
+        if args.profile:
+            app.config['profile_dir'] = args.profile
+        jobs = None
+        if app.config.get('jobs') or args.job:
+            try:
+                jobs = load_jobs(app.config, args.job)
+            except ValueError as e:
+                print(f"ERROR: {e}")
+                app.on_closing()
+                sys.exit(1)
+            if args.resume and len(jobs) != 1:
+                print("ERROR: --resume with a multi-job config needs the run's job, e.g. --job NAME")
+                app.on_closing()
+                sys.exit(1)
         drive_letter = 'Z' # drive letter
         network_path = app.config.get('network_path', '') # network share path
         username = app.config.get('network_user', '') 
@@ -131,8 +220,35 @@ def main():
             print("ERROR: Failed to map network drive Z:")
             sys.exit(1)
 
+        if args.daemon or args.watch:
+            if jobs is None:
+                # A single-job config is its own job
+                jobs = [dict(app.config, name=app.config.get('task_name') or 'default')]
+            stop_event = threading.Event()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stop_event.set())
+            try:
+                if args.watch:
+                    success = run_watch(app, jobs, stop_event)
+                else:
+                    run_daemon(app, jobs, stop_event)
+                    success = True
+            except ValueError as e:
+                print(f"ERROR: {e}")
+                sys.exit(1)
+            finally:
+                app.on_closing()
+                unmap_network_drive(drive_letter)
+            sys.exit(0 if success else 1)
+
         try:
-            success = app.perform_file_operation()
+            if jobs is None:
+                success = app.perform_file_operation(resume_run_id=args.resume)
+            elif args.resume:
+                success = job_app(app, jobs[0]).perform_file_operation(resume_run_id=args.resume)
+            else:
+                success = all(run_jobs(app, jobs).values())
+            apply_retention(app)  # After the run, so the purge never competes with it
             app.on_closing()
         finally:
             # Always unmount the drive
@@ -5,7 +5,7 @@ from scheduler.task_scheduler import create_windows_task, delete_windows_task, c
 from fileOperation.fileOperations import run_once
 from utils.utils import preview_destination,view_windows_tasks
 from emailer.email import test_email
-from database.db import refresh_logs,clear_old_logs,export_logs
+from database.db import refresh_logs,reset_logs,load_older_logs,clear_old_logs,export_logs
 def create_file_ops_tab(self,notebook):
 
     """Create file operations configuration tab"""
@@ -232,6 +232,35 @@ def create_logs_tab(self, notebook):
     frame = ttk.Frame(notebook)
     notebook.add(frame, text="Logs")
     
+    # Filters, applied in the database query
+    filter_frame = ttk.Frame(frame)
+    filter_frame.pack(fill=tk.X, padx=5, pady=5)
+    self.log_status_filter = tk.StringVar(value="All")
+    self.log_mode_filter = tk.StringVar(value="All")
+    self.log_date_from = tk.StringVar()
+    self.log_date_to = tk.StringVar()
+    
+    ttk.Label(filter_frame, text="Status:").pack(side=tk.LEFT, padx=(0, 2))
+    ttk.Combobox(filter_frame, textvariable=self.log_status_filter, values=["All", "SUCCESS", "ERROR"],
+                 width=9, state="readonly").pack(side=tk.LEFT, padx=(0, 8))
+    ttk.Label(filter_frame, text="Mode:").pack(side=tk.LEFT, padx=(0, 2))
+    ttk.Combobox(filter_frame, textvariable=self.log_mode_filter, values=["All", "GUI", "BATCH"],
+                 width=7, state="readonly").pack(side=tk.LEFT, padx=(0, 8))
+    ttk.Label(filter_frame, text="From (YYYY-MM-DD):").pack(side=tk.LEFT, padx=(0, 2))
+    ttk.Entry(filter_frame, textvariable=self.log_date_from, width=11).pack(side=tk.LEFT, padx=(0, 8))
+    ttk.Label(filter_frame, text="To:").pack(side=tk.LEFT, padx=(0, 2))
+    ttk.Entry(filter_frame, textvariable=self.log_date_to, width=11).pack(side=tk.LEFT, padx=(0, 8))
+    ttk.Button(filter_frame, text="Apply", command=lambda:reset_logs(self)).pack(side=tk.LEFT, padx=2)
+    
+    def clear_filters():
+        self.log_status_filter.set("All")
+        self.log_mode_filter.set("All")
+        self.log_date_from.set("")
+        self.log_date_to.set("")
+        reset_logs(self)
+    
+    ttk.Button(filter_frame, text="Clear", command=clear_filters).pack(side=tk.LEFT, padx=2)
+    
     # Logs tree view
     columns = ('Timestamp', 'Operation', 'Status', 'Files', 'Date Folder', 'Mode', 'Source', 'Final Destination')
     self.logs_tree = ttk.Treeview(frame, columns=columns, show='headings', height=15)
@@ -247,7 +276,14 @@ def create_logs_tab(self, notebook):
     # Scrollbars
     v_scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.logs_tree.yview)
     h_scrollbar = ttk.Scrollbar(frame, orient=tk.HORIZONTAL, command=self.logs_tree.xview)
-    self.logs_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+    
+    def on_scroll(first, last):
+        v_scrollbar.set(first, last)
+        # Near the bottom: fetch the next page of older entries
+        if float(last) >= 0.95:
+            self.root.after_idle(lambda: load_older_logs(self))
+    
+    self.logs_tree.configure(yscrollcommand=on_scroll, xscrollcommand=h_scrollbar.set)
     
     # Pack logs components
     self.logs_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
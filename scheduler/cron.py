@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+DAYS = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+# (name, lowest, highest, names for the values from lowest up)
+FIELDS = [
+    ("minute", 0, 59, None),
+    ("hour", 0, 23, None),
+    ("day of month", 1, 31, None),
+    ("month", 1, 12, MONTHS),
+    ("day of week", 0, 7, DAYS),
+]
+
+
+class CronSchedule:
+    """A standard five-field cron expression: minute hour day-of-month month day-of-week.
+
+    Fields take *, numbers, ranges (1-5), steps (*/15, 8-18/2), lists (1,15)
+    and, for months and weekdays, names (jan, mon-fri). Day of week 0 and 7
+    are both Sunday. As in cron, when both day fields are restricted a day
+    matching either of them matches. The @hourly, @daily, @weekly, @monthly
+    and @yearly shorthands are accepted too.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = MACROS.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression '{expression}': expected 5 fields, got {len(fields)}")
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            parse_field(text, *spec, expression=expression) for text, spec in zip(fields, FIELDS))
+        if 7 in self.weekdays:
+            self.weekdays = (self.weekdays - {7}) | {0}
+        self.any_day = fields[2].startswith("*")
+        self.any_weekday = fields[4].startswith("*")
+
+    def day_matches(self, when):
+        in_days = when.day in self.days
+        in_weekdays = (when.weekday() + 1) % 7 in self.weekdays  # cron counts from Sunday
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, after):
+        """The first matching minute after the datetime after"""
+        when = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Every valid expression matches within a leap-year cycle; this only guards against 30 February
+        limit = when + timedelta(days=366 * 8)
+        while when < limit:
+            if when.month not in self.months:
+                when = datetime(when.year + when.month // 12, when.month % 12 + 1, 1)
+            elif not self.day_matches(when):
+                when = when.replace(hour=0, minute=0) + timedelta(days=1)
+            elif when.hour not in self.hours:
+                when = when.replace(minute=0) + timedelta(hours=1)
+            elif when.minute not in self.minutes:
+                when += timedelta(minutes=1)
+            else:
+                return when
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+def parse_field(text, name, lowest, highest, names=None, expression=""):
+    """The set of values a cron field allows"""
+    def value(token):
+        token = token.lower()
+        if names and token in names:
+            return lowest + names.index(token)
+        if not token.isdigit() or not lowest <= int(token) <= highest:
+            raise ValueError(f"Invalid {name} '{token}' in cron expression '{expression}'")
+        return int(token)
+
+    values = set()
+    for part in text.split(","):
+        span, _, step = part.partition("/")
+        if step and (not step.isdigit() or int(step) == 0):
+            raise ValueError(f"Invalid step '{step}' in cron expression '{expression}'")
+        if span == "*":
+            start, end = lowest, highest
+        elif "-" in span:
+            start, end = (value(token) for token in span.split("-", 1))
+        else:
+            start = end = value(span)
+            if step:
+                end = highest  # 5/15 means from 5 on, every 15
+        if start > end:
+            raise ValueError(f"Invalid {name} range '{span}' in cron expression '{expression}'")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
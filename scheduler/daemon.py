@@ -0,0 +1,108 @@
+import heapq
+import threading
+from datetime import datetime, timedelta
+from scheduler.cron import CronSchedule
+from fileOperation.jobs import JobRunner
+from database.retention import apply_retention
+
+# schedule_frequency as cron, matching what schtasks does without /d: weekly on Monday, monthly on the 1st
+FREQUENCIES = {
+    "daily": "{minute} {hour} * * *",
+    "weekly": "{minute} {hour} * * 1",
+    "monthly": "{minute} {hour} 1 * *",
+    "once": "{minute} {hour} * * *",
+}
+
+# Wake at least this often, so a changed system clock (or a suspend) is noticed
+MAX_SLEEP_SECONDS = 60
+
+
+def job_schedule(job):
+    """(CronSchedule, repeats) for a job: schedule_cron if set, otherwise schedule_time and schedule_frequency"""
+    if job.get('schedule_cron'):
+        return CronSchedule(job['schedule_cron']), True
+    frequency = str(job.get('schedule_frequency', 'daily')).lower()
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unsupported schedule_frequency '{frequency}'. Use one of: {', '.join(FREQUENCIES)}, "
+                         "or set schedule_cron")
+    try:
+        scheduled = datetime.strptime(str(job.get('schedule_time', '00:00')), "%H:%M")
+    except ValueError:
+        raise ValueError(f"Invalid schedule_time '{job.get('schedule_time')}', use HH:MM") from None
+    expression = FREQUENCIES[frequency].format(minute=scheduled.minute, hour=scheduled.hour)
+    return CronSchedule(expression), frequency != "once"
+
+
+class ScheduledJob:
+    def __init__(self, job):
+        self.job = job
+        self.name = job['name']
+        self.schedule, self.repeats = job_schedule(job)
+        self.running = False
+        self.coalesced = False  # Fired again while running; runs once more when the current run ends
+
+
+def run_daemon(self, jobs, stop_event=None):
+    """Run jobs (from load_jobs) on their schedules until stop_event is set or no firing is left.
+
+    The next firing of every job sits on a heap ordered by time, and the loop
+    sleeps until the earliest one. Jobs run in this process through one
+    JobRunner, so the transfer pool, database writer and SMTP connections stay
+    warm between runs. A job that fires while its previous run is still going
+    is not started twice: however many firings it misses, it runs once more
+    when the current run ends. Old records are purged once a day.
+    """
+    stop_event = stop_event or threading.Event()
+    scheduled = [ScheduledJob(job) for job in jobs]  # Raises ValueError for a bad schedule before anything runs
+    runner = JobRunner(self)
+    lock = threading.Lock()
+    heap = []
+    now = datetime.now()
+    for order, entry in enumerate(scheduled):
+        heap.append((entry.schedule.next_after(now), order, entry))
+        print(f"[BATCH] Job '{entry.name}' scheduled ({entry.schedule.expression}), next run at {heap[-1][0]:%Y-%m-%d %H:%M}")
+    # Retention rides on the heap as well, first shortly after start
+    heap.append((now + timedelta(minutes=1), len(scheduled), None))
+    heapq.heapify(heap)
+    print(f"[BATCH] Scheduler daemon started with {len(scheduled)} jobs, "
+          f"{runner.max_jobs} at a time on {runner.workers} shared workers")
+
+    def finished(entry):
+        def on_done(name, succeeded):
+            with lock:
+                if entry.coalesced and not stop_event.is_set():
+                    entry.coalesced = False
+                    print(f"[BATCH] Job '{name}' fired during its last run, running it again now")
+                    runner.submit(entry.job, on_done)
+                else:
+                    entry.running = False
+        return on_done
+
+    try:
+        while not stop_event.is_set() and any(entry is not None for _, _, entry in heap):
+            when, order, entry = heap[0]
+            delay = (when - datetime.now()).total_seconds()
+            if delay > 0:
+                stop_event.wait(min(delay, MAX_SLEEP_SECONDS))
+                continue
+            heapq.heappop(heap)
+            if entry is None:
+                apply_retention(self)
+                heapq.heappush(heap, (datetime.now() + timedelta(days=1), order, None))
+                continue
+
+            with lock:
+                if entry.running:
+                    if not entry.coalesced:
+                        print(f"[BATCH] Job '{entry.name}' is still running, its next run starts when this one ends")
+                    entry.coalesced = True
+                else:
+                    entry.running = True
+                    runner.submit(entry.job, finished(entry))
+            if entry.repeats:
+                # From now, not from when: firings missed while the machine slept collapse into this one
+                heapq.heappush(heap, (entry.schedule.next_after(max(when, datetime.now())), order, entry))
+    finally:
+        print("[BATCH] Scheduler daemon stopping, waiting for running jobs to finish")
+        runner.close()
+    print("[BATCH] Scheduler daemon stopped")